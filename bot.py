@@ -1,28 +1,60 @@
+import asyncio
 import contextlib
+import csv
+import io
 import os
-import sys
+import signal
+import socket
+import threading
+import time
 import urllib.parse
 
 import aiohttp
 import discord
 from discord.ext import commands, tasks
 from dotenv import load_dotenv
-from firebase_admin import firestore
-from google.cloud.firestore import FieldFilter
 
-from database import GUILD_CONFIG_COLLECTION, TRACKED_USERS_COLLECTION, database_startup
-from logger_config import logger
+from cache import TTLCache
+from database import database_startup
+from graphing import GraphRenderer
+from history import (
+    append_point,
+    current_season,
+    describe_score,
+    division_ticks,
+    ladder_score,
+    series_points,
+    series_version,
+    summarize_history,
+)
+from live import LiveGameTracker
+from logger_config import logger, new_correlation_id
+from loop_watchdog import LoopWatchdog
+from partition import LEASE_RENEW_SECONDS, PartitionLeaser, parse_shard_ids
+from profiler import DEFAULT_PROFILE_DIR, PROFILE_TARGETS, ProfileCapture
+from scouting import aggregate_scouting
 from sentry_config import setup_sentry
+from snapshot import DEFAULT_SNAPSHOT_PATH, decode_entries, load_snapshot, save_snapshot
 from utils import (
+    MATCH_HEDGE_SECONDS,
+    RANK_ORDER,
+    TIER_ORDER,
+    CircuitOpenError,
     RateLimitError,
     RiotAPIError,
     UserNotFoundError,
     extract_match_info,
+    get_active_game,
+    get_champion_names,
+    get_match_ids,
+    get_matches,
     get_puuid,
     get_ranked_info,
     get_recent_match_info,
+    get_top_mastery,
     parse_riot_id,
 )
+from warehouse import DEFAULT_WAREHOUSE_PATH, MatchWarehouse, backfill_matches
 
 # API Keys
 
@@ -30,37 +62,85 @@ load_dotenv()
 DISCORD_KEY = os.getenv("DISCORD_PUBLIC_KEY")
 RIOT_API_KEY = os.getenv("RIOT_API_KEY")
 
-# Sentry Initialization
+# Storage backend, opened alongside Sentry in MyBot.setup_hook
+db = None
 
-setup_sentry()
+# Bot Startup
 
-# Sorting Helpers
+BOT_PREFIX = "!"
 
-TIER_ORDER = {
-    "CHALLENGER": 9,
-    "GRANDMASTER": 8,
-    "MASTER": 7,
-    "DIAMOND": 6,
-    "EMERALD": 5,
-    "PLATINUM": 4,
-    "GOLD": 3,
-    "SILVER": 2,
-    "BRONZE": 1,
-    "IRON": 0,
-    "UNRANKED": -1,
-}
-RANK_ORDER = {"I": 4, "II": 3, "III": 2, "IV": 1, "": 0}
+# Multi-Process Configuration
 
-# Database Startup
+# Discord shards handled by this process, e.g. SHARD_COUNT=4 and SHARD_IDS=0-1.
+# Left unset, discord.py picks the shard count and runs every shard here.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0")) or None
+SHARD_IDS = parse_shard_ids(os.getenv("SHARD_IDS"))
+# Set POLL_PARTITIONS to split polling of tracked users between processes
+POLL_PARTITIONS = int(os.getenv("POLL_PARTITIONS", "0"))
+WORKER_ID = os.getenv("WORKER_ID") or socket.gethostname()
 
-db = database_startup()
-if not db:
-    logger.error("❌ ERROR: Database did not properly initialize")
-    sys.exit(1)
+# Sweep Configuration
 
-# Bot Startup
+SWEEP_STATE_KEY = "sweep"
+SWEEP_INTERVAL_MINUTES = 10
+# Players refreshed more recently than this are skipped by the background sweep
+MIN_POLL_INTERVAL_SECONDS = 5 * 60
+# How many players are processed between two durable cursor writes
+SWEEP_CHECKPOINT_EVERY = 10
+# Time range summarized by the !history command
+HISTORY_WINDOW_SECONDS = 7 * 24 * 60 * 60
 
-BOT_PREFIX = "!"
+# Scouting Configuration
+
+SCOUT_DEFAULT_MATCHES = 10
+SCOUT_MAX_MATCHES = 30
+SCOUT_CACHE_SECONDS = 15 * 60
+SCOUT_TOP_CHAMPIONS = 5
+
+# Manual Update Configuration
+
+# Users refreshed within this window are reused by !update instead of re-fetched
+UPDATE_STALENESS_SECONDS = int(os.getenv("UPDATE_STALENESS_SECONDS", "120"))
+UPDATE_CONCURRENCY = 8
+UPDATE_COOLDOWN_SECONDS = 30
+UPDATE_PROGRESS_EDIT_SECONDS = 1.5
+
+# Bulk Tracking Configuration
+
+TRACKMANY_MAX_PLAYERS = 100
+TRACKMANY_CONCURRENCY = 8
+DISCORD_MESSAGE_LIMIT = 2000
+
+# Live Game Configuration
+
+LIVE_POLL_CONCURRENCY = 8
+# Long enough to outlast any game, so each game is announced once per channel
+LIVE_ANNOUNCE_SECONDS = 2 * 60 * 60
+
+# Match Warehouse Configuration
+
+BACKFILL_DEFAULT_MATCHES = 20
+BACKFILL_MAX_MATCHES = 100  # the most match ids Riot returns per request
+
+# Warm Restart Configuration
+
+# Caches and schedules are saved here on shutdown and reloaded on boot. Give
+# each process its own path when several run from the same directory.
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH)
+
+# Profiling Configuration
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", DEFAULT_PROFILE_DIR)
+PROFILE_MAX_RUNS = 20
+# Sweeps captured when the process receives SIGUSR1
+PROFILE_SIGNAL_SWEEPS = 1
+
+# Lobby Configuration
+
+LOBBY_MAX_PLAYERS = 10
+LOBBY_TOP_MASTERY = 3
+# Riot IDs rarely change owner, so resolved puuids are kept around for a day
+PUUID_CACHE_SECONDS = 24 * 60 * 60
 
 class MyHelp(commands.MinimalHelpCommand):
     def add_bot_commands_formatting(self, commands, _heading):
@@ -91,7 +171,7 @@ class MyHelp(commands.MinimalHelpCommand):
         command_name = f"{self.context.clean_prefix}{self.invoked_with}"
         return f"Use `{command_name} [command]` for more info on a command."
 
-class MyBot(commands.Bot):
+class MyBot(commands.AutoShardedBot):
     def __init__(self):
         intents = discord.Intents.default()
         intents.message_content = True
@@ -105,91 +185,272 @@ class MyBot(commands.Bot):
             command_prefix=BOT_PREFIX,
             intents=intents,
             activity=activity,
+            shard_count=SHARD_COUNT,
+            shard_ids=SHARD_IDS,
         )
         self.session = None  # placeholder
+        self.graph_renderer = GraphRenderer()
+        self.scout_cache = TTLCache(maxsize=512, ttl=SCOUT_CACHE_SECONDS)
+        self.puuid_cache = TTLCache(maxsize=4096, ttl=PUUID_CACHE_SECONDS)
+        self.champion_names = None  # loaded from Data Dragon on first use
+        self.warehouse = MatchWarehouse(
+            os.getenv("WAREHOUSE_PATH", DEFAULT_WAREHOUSE_PATH),
+        )
+        self.live_tracker = LiveGameTracker()
+        self.announced_games = TTLCache(maxsize=1024, ttl=LIVE_ANNOUNCE_SECONDS)
+        self.watchdog = LoopWatchdog()
+        self.profile_capture = ProfileCapture()
+        self.guild_updates_running = {}  # guild id -> running !update task
+        self.guild_updates_finished = TTLCache(
+            maxsize=4096,
+            ttl=UPDATE_COOLDOWN_SECONDS,
+        )
+        self.partitions = None
+        self.last_sweep_finished = None
+        self.shutdown_task = None
+        # Tracked users as of the last sweep or track/untrack, see tracked_roster
+        self.tracked_users = None
 
     async def setup_hook(self):
         # runs when the bot starts up.
+        global db
+        # None of these depend on each other, so they start up side by side
+        _, db, snapshot = await asyncio.gather(
+            asyncio.to_thread(setup_sentry),
+            asyncio.to_thread(database_startup),
+            asyncio.to_thread(load_snapshot, SNAPSHOT_PATH),
+        )
+        if not db:
+            logger.error("❌ ERROR: Database did not properly initialize")
+            raise RuntimeError("Database did not properly initialize")
+        if snapshot:
+            self.restore_warm_state(snapshot)
+        if POLL_PARTITIONS:
+            self.partitions = PartitionLeaser(db, WORKER_ID, POLL_PARTITIONS)
         self.session = aiohttp.ClientSession()
         logger.info("✅ Persistent HTTP Session created.")
+        self.watchdog.start()
+        loop = asyncio.get_running_loop()
+        if hasattr(signal, "SIGUSR1"):
+            with contextlib.suppress(NotImplementedError, RuntimeError):
+                loop.add_signal_handler(signal.SIGUSR1, self.profile_from_signal)
+        # docker stop sends SIGTERM, shut down cleanly so the snapshot is saved
+        # and our partitions are released
+        with contextlib.suppress(NotImplementedError, RuntimeError):
+            loop.add_signal_handler(signal.SIGTERM, self.close_from_signal)
+        if self.partitions and not self.partition_lease_task.is_running():
+            self.partition_lease_task.start()
+            logger.info(f"✅ Partition leasing started as worker {WORKER_ID}.")
         if not self.background_update_task.is_running():
             self.background_update_task.start()
             logger.info("✅ Background update task started.")
+        if not self.live_game_task.is_running():
+            self.live_game_task.start()
+            logger.info("✅ Live game task started.")
 
     async def close(self):
         # runs when the bot shuts down.
+        if db is not None:
+            try:
+                await asyncio.to_thread(
+                    save_snapshot,
+                    SNAPSHOT_PATH,
+                    self.warm_state(),
+                )
+                logger.info(f"🛑 Warm-state snapshot saved to {SNAPSHOT_PATH}.")
+            except (OSError, TypeError, ValueError) as e:
+                logger.exception(f"❌ ERROR: saving warm-state snapshot: {e}")
+        try:
+            # Matches buffered since the last sweep would be lost otherwise
+            flushed = await asyncio.to_thread(self.warehouse.flush)
+            if flushed:
+                logger.info(f"🛑 Flushed {flushed} buffered warehouse rows.")
+        except OSError as e:
+            logger.exception(f"❌ ERROR: flushing the match warehouse: {e}")
         if self.session:
             await self.session.close()
             logger.info("🛑 HTTP Session closed.")
+        self.graph_renderer.shutdown()
+        self.watchdog.stop()
+        if self.partitions:
+            # Hand our partitions over right away instead of waiting for expiry
+            self.partitions.release_all(time.time())
         await super().close()
 
+    def warm_state(self):
+        """Returns the in-memory state worth carrying over a restart."""
+        return {
+            "puuid_cache": self.puuid_cache.entries(),
+            "scout_cache": self.scout_cache.entries(),
+            "announced_games": self.announced_games.entries(),
+            "champion_names": self.champion_names,
+            "live_tracker": self.live_tracker.snapshot(),
+            "last_sweep_finished": self.last_sweep_finished,
+        }
+
+    def restore_warm_state(self, state):
+        self.puuid_cache.restore(decode_entries(state.get("puuid_cache", [])))
+        self.scout_cache.restore(decode_entries(state.get("scout_cache", [])))
+        self.announced_games.restore(
+            decode_entries(state.get("announced_games", [])),
+        )
+        if state.get("champion_names"):
+            # JSON object keys are strings, champion ids are ints
+            self.champion_names = {
+                int(key): name for key, name in state["champion_names"].items()
+            }
+        self.live_tracker.restore(state.get("live_tracker", {}))
+        self.last_sweep_finished = state.get("last_sweep_finished")
+        logger.info(
+            f"✅ Warm state restored ({len(self.puuid_cache.entries())} puuids, "
+            f"{len(self.live_tracker.next_check)} live schedules).",
+        )
+
+    def close_from_signal(self):
+        logger.info("🛑 SIGTERM received, shutting down.")
+        self.shutdown_task = asyncio.ensure_future(self.close())
+
+    def profile_from_signal(self):
+        if not self.profile_capture.arm(
+            "sweep",
+            PROFILE_SIGNAL_SWEEPS,
+            threading.get_ident(),
+        ):
+            logger.warning("⚠️ A profile is already being captured")
+
+    def tracked_roster(self):
+        """Returns the cached tracked users, reading storage only when it's cold.
+
+        Each sweep reloads the roster and track/untrack clear it, so callers
+        that poll often (e.g. the live game loop) don't read every user each time.
+        """
+        if self.tracked_users is None:
+            self.tracked_users = db.get_all_tracked_users()
+        return self.tracked_users
+
+    def owns_user(self, user):
+        """Whether this process is responsible for polling the tracked user."""
+        return self.partitions is None or self.partitions.owns(user.get("puuid"))
+
+    def sweep_state_key(self):
+        # Each worker sweeps its own partitions, so each keeps its own cursor
+        if self.partitions is None:
+            return SWEEP_STATE_KEY
+        return f"{SWEEP_STATE_KEY}-{WORKER_ID}"
+
     # Background Task
 
-    @tasks.loop(minutes=10)
+    @tasks.loop(minutes=SWEEP_INTERVAL_MINUTES)
     async def background_update_task(self):
+        new_correlation_id("sweep")
+        self.profile_capture.begin("sweep")
         try:
             logger.info("♻️ Starting background update loop")
-            docs = db.collection(TRACKED_USERS_COLLECTION).stream()
-            doc_list = list(docs)
-            for doc in doc_list:
-                old_tier = doc.get("tier")
-                old_rank = doc.get("rank")
-                old_lp = doc.get("LP")
-                puuid = doc.get("puuid")
-                data = await get_ranked_info(bot.session, puuid, RIOT_API_KEY)
-                new_tier = data.get("tier")
-                new_rank = data.get("rank")
-                new_lp = data.get("LP")
-                doc.reference.update(data)
-                if old_tier == new_tier and old_rank == new_rank and old_lp == new_lp:
+            sweep_state = db.get_bot_state(self.sweep_state_key()) or {}
+            self.tracked_users = db.get_all_tracked_users()
+            users = order_users_for_sweep(
+                [u for u in self.tracked_users if self.owns_user(u)],
+                sweep_state.get("cursor"),
+            )
+            for processed, user in enumerate(users):
+                if processed and processed % SWEEP_CHECKPOINT_EVERY == 0:
+                    # Everything before this player has been fully handled
+                    db.set_bot_state(
+                        self.sweep_state_key(),
+                        {"cursor": users[processed - 1].get("riot_id")},
+                    )
+                if is_recently_polled(user, time.time()):
                     continue
-                guild_ids = doc.get("guild_ids")
-                for guild in guild_ids:
-                    channel = None
-                    try:
-                        config_ref = (
-                            db.collection(GUILD_CONFIG_COLLECTION).document(guild)
-                        )
-                        config = config_ref.get()
-                        if config.exists:
-                            channel_id = config.get("channel_id")
-                            channel = bot.get_channel(channel_id)
-                    except Exception as e:
-                        logger.exception(
-                            f"❌ ERROR: fetching config for guild {guild}: {e}",
-                        )
-                    if channel:
-                        riot_id = doc.get("riot_id")
-                        match_info = await get_recent_match_info(
-                            bot.session,
-                            puuid,
-                            RIOT_API_KEY,
-                        )
-                        processed_match_info = extract_match_info(match_info, puuid)
-                        ranked_data = {
-                            "old_tier": old_tier,
-                            "old_rank": old_rank,
-                            "old_lp": old_lp,
-                            "new_tier": new_tier,
-                            "new_rank": new_rank,
-                            "new_lp": new_lp,
-                        }
-                        view = MatchDetailsView(
-                            processed_match_info,
-                            ranked_data,
-                            riot_id,
-                            puuid,
-                        )
-                        initial_embed = view.create_minimized_embed()
-                        message = await channel.send(embed=initial_embed, view=view)
-                        view.message = message
+                # The roster was read when the sweep started, a post-game check
+                # or !update may have refreshed this player since
+                user = db.get_tracked_user(user.get("riot_id"))
+                if user is None or is_recently_polled(user, time.time()):
+                    continue
+                try:
+                    await refresh_tracked_user(user)
+                except CircuitOpenError as e:
+                    # Riot is down, resume from the last checkpoint next time
+                    logger.warning(f"⚠️ Pausing sweep: {e}")
+                    return
+                except RiotAPIError as e:
+                    logger.warning(f"⚠️ Skipping {user.get('riot_id')}: {e}")
+            # A completed sweep starts over from the first player next time
+            db.set_bot_state(self.sweep_state_key(), {"cursor": None})
+            self.last_sweep_finished = time.time()
+            await asyncio.to_thread(bot.warehouse.flush)
         except Exception as e:
             logger.exception(f"❌ ERROR: {e}")
+        finally:
+            await finish_profile(self.profile_capture.end("sweep"))
 
 
     @background_update_task.before_loop
     async def before_background_task(self):
         await self.wait_until_ready()
+        delay = 0
+        if self.last_sweep_finished is not None:
+            # Don't re-poll everyone right after a restart, keep the old cadence
+            delay = max(
+                self.last_sweep_finished + SWEEP_INTERVAL_MINUTES * 60 - time.time(),
+                0,
+            )
+        # Logged whether or not the first sweep waits, the deploy checks for it
+        logger.info(
+            f"♻️ Background update loop ready, first sweep in {delay:.0f} seconds",
+        )
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    @tasks.loop(minutes=1)
+    async def live_game_task(self):
+        new_correlation_id("live")
+        try:
+            now = time.time()
+            users = self.live_tracker.due_players(
+                [u for u in self.tracked_roster() if self.owns_user(u)],
+                now,
+            )
+            semaphore = asyncio.Semaphore(LIVE_POLL_CONCURRENCY)
+
+            async def check(user):
+                async with semaphore:
+                    return await get_active_game(
+                        self.session,
+                        user.get("puuid"),
+                        RIOT_API_KEY,
+                    )
+
+            games = await asyncio.gather(
+                *(check(user) for user in users),
+                return_exceptions=True,
+            )
+            for user, game in zip(users, games, strict=True):
+                if isinstance(game, Exception):
+                    logger.warning(
+                        f"⚠️ Spectator check failed for {user.get('riot_id')}: {game}",
+                    )
+                    continue
+                event = self.live_tracker.record_check(user, game, now)
+                if event == "started":
+                    await announce_live_game(user, game)
+            # Players whose game just ended get their rank checked right away
+            for riot_id in self.live_tracker.post_game_due(now):
+                user = db.get_tracked_user(riot_id)
+                if user is None or await refresh_tracked_user(user):
+                    self.live_tracker.resolve_finished(riot_id)
+        except Exception as e:
+            logger.exception(f"❌ ERROR: live game loop: {e}")
+
+    @live_game_task.before_loop
+    async def before_live_game_task(self):
+        await self.wait_until_ready()
+
+    @tasks.loop(seconds=LEASE_RENEW_SECONDS)
+    async def partition_lease_task(self):
+        try:
+            await asyncio.to_thread(self.partitions.rebalance, time.time())
+        except Exception as e:
+            logger.exception(f"❌ ERROR: renewing partition leases: {e}")
 
 
 bot = MyBot()
@@ -351,6 +612,8 @@ async def on_ready():
 async def on_command_error(ctx, error):
     if isinstance(error, commands.CommandNotFound):
         await ctx.send("Sorry, I don't know that command")
+    elif isinstance(error, commands.NotOwner):
+        await ctx.send("Only the bot owner can use this command.")
     elif isinstance(error, commands.MissingRequiredArgument):
         await ctx.send(
             f"Missing arguments. Usage: !{ctx.command} '{ctx.command.signature}'",
@@ -393,23 +656,13 @@ async def track(ctx, *, riot_id):
     doc_id = f"{username}#{tagline}"
     # API handling
     puuid = await get_puuid(bot.session, username, tagline, RIOT_API_KEY)
-    # DB handling
-    guild_id_str = str(ctx.guild.id)
-    doc_ref = db.collection(TRACKED_USERS_COLLECTION).document(doc_id)
+    bot.puuid_cache.set(doc_id, puuid)
     ranked_data = await get_ranked_info(bot.session, puuid, RIOT_API_KEY)
+    # DB handling
     try:
-        doc_ref.set(
-            {
-                "riot_id": f"{username}#{tagline}",
-                "puuid": puuid,
-                "tier": f"{ranked_data.get('tier')}",
-                "rank": f"{ranked_data.get('rank')}",
-                "LP": ranked_data.get("LP"),
-                "guild_ids": firestore.ArrayUnion([guild_id_str]),
-                f"server_info.{guild_id_str}": {"added_by": ctx.author.id},
-            },
-            merge=True,
-        )
+        db.track_user(doc_id, puuid, ranked_data, ctx.guild.id, ctx.author.id)
+        bot.tracked_users = None
+        record_lp_history(puuid, ranked_data)
         await ctx.send(f"{doc_id} is now being tracked!")
     except Exception as e:
         logger.exception(f"❌ ERROR: tracking: {e}")
@@ -417,6 +670,81 @@ async def track(ctx, *, riot_id):
         raise e
 
 
+@bot.command()
+async def trackmany(ctx, *, riot_ids=""):
+    """Adds many users to the list of users tracked by the bot at once.
+
+    Usage: !trackmany <riotid1>, <riotid2>, ...
+    Riotids can be separated by commas or new lines, or sent as an attached .csv
+    file. Up to 100 users are looked up at the same time and saved together.
+    """
+    if db is None:
+        return await ctx.send("Database Error")
+    text = riot_ids
+    for attachment in ctx.message.attachments:
+        if attachment.filename.lower().endswith(".csv"):
+            content = await attachment.read()
+            text += "\n" + content.decode("utf-8", errors="replace")
+    entries = split_riot_id_list(text)
+    if not entries:
+        return await ctx.send(
+            "Please provide riotids, e.g. !trackmany username#tagline, "
+            "username#tagline, or attach a .csv file.",
+        )
+    if len(entries) > TRACKMANY_MAX_PLAYERS:
+        return await ctx.send(
+            f"Please provide at most {TRACKMANY_MAX_PLAYERS} riotids at a time.",
+        )
+    semaphore = asyncio.Semaphore(TRACKMANY_CONCURRENCY)
+
+    async def resolve(entry):
+        parsed = parse_riot_id(entry)
+        if not parsed:
+            return "invalid riotid"
+        username, tagline = parsed
+        async with semaphore:
+            puuid = await resolve_puuid(username, tagline)
+            ranked_data = await get_ranked_info(bot.session, puuid, RIOT_API_KEY)
+        return (f"{username}#{tagline}", puuid, ranked_data)
+
+    results = await asyncio.gather(
+        *(resolve(entry) for entry in entries),
+        return_exceptions=True,
+    )
+    tracked = []
+    failed = []
+    for entry, result in zip(entries, results, strict=True):
+        if isinstance(result, tuple):
+            tracked.append(result)
+        elif isinstance(result, UserNotFoundError):
+            failed.append(f"❌ {entry} - user not found")
+        elif isinstance(result, RiotAPIError):
+            failed.append(f"❌ {entry} - Riot API issue: {result}")
+        elif isinstance(result, Exception):
+            logger.error(f"❌ ERROR: trackmany lookup: {result}", exc_info=result)
+            failed.append(f"❌ {entry} - lookup failed")
+        else:
+            failed.append(f"❌ {entry} - {result}")
+    if tracked:
+        try:
+            db.track_users(tracked, ctx.guild.id, ctx.author.id)
+            bot.tracked_users = None
+        except Exception as e:
+            logger.exception(f"❌ ERROR: bulk tracking: {e}")
+            await ctx.send("Database write failed.")
+            raise e
+
+        def record_baselines():
+            for _, puuid, ranked_data in tracked:
+                record_lp_history(puuid, ranked_data)
+
+        await asyncio.to_thread(record_baselines)
+    lines = [f"Tracked {len(tracked)}/{len(entries)} users."]
+    lines += [f"✅ {riot_id}" for riot_id, _, _ in tracked]
+    lines += failed
+    await ctx.send(truncate_lines(lines, DISCORD_MESSAGE_LIMIT))
+
+
 @bot.command()
 async def untrack(ctx, *, riot_id):
     """Removes a user from the list of users tracked by the bot.
@@ -436,26 +764,13 @@ async def untrack(ctx, *, riot_id):
     tagline = parsed[1]
     doc_id = f"{username}#{tagline}"
     # DB handling
-    guild_id_str = str(ctx.guild.id)
-    doc_ref = db.collection(TRACKED_USERS_COLLECTION).document(doc_id)
     try:
-        doc = doc_ref.get()
-        if not doc.exists:
+        if db.get_tracked_user(doc_id) is None:
             return await ctx.send(f"{doc_id} is not in the database.")
-        data = doc.to_dict()
-        guild_list = data.get("guild_ids", [])
-        if guild_id_str not in guild_list:
+        if not db.untrack_user(doc_id, ctx.guild.id):
             return await ctx.send(f"{doc_id} is not being tracked in this server.")
-        guild_list.remove(guild_id_str)
-        if not guild_list:
-            # We are the only server left, delete the whole file
-            doc_ref.delete()
-            await ctx.send(f"{doc_id} is no longer tracked")
-        else:
-            data["guild_ids"] = guild_list
-            del data[f"server_info.{guild_id_str}"]
-            doc_ref.set(data)
-            await ctx.send(f"{doc_id} is no longer tracked")
+        bot.tracked_users = None
+        await ctx.send(f"{doc_id} is no longer tracked")
     except Exception as e:
         logger.exception(f"❌ ERROR: untracking: {e}")
         await ctx.send("Database update failed")
@@ -470,43 +785,34 @@ async def update(ctx):
     """
     if db is None:
         return await ctx.send("Database Error")
-    guild_id_str = str(ctx.guild.id)
-    docs = (
-        db.collection(TRACKED_USERS_COLLECTION)
-        .where(filter=FieldFilter("guild_ids", "array_contains", guild_id_str))
-        .stream()
-    )
-    doc_list = list(docs)
-    if not doc_list:
+    guild_id = ctx.guild.id
+    running = bot.guild_updates_running.get(guild_id)
+    if running is not None:
+        # Repeat callers follow the running update's status message instead of
+        # getting replies of their own
+        with contextlib.suppress(discord.HTTPException):
+            await ctx.message.add_reaction("⏳")
+        await asyncio.wait([running])
+        with contextlib.suppress(discord.HTTPException):
+            await ctx.message.add_reaction("✅")
+        return
+    finished_at = bot.guild_updates_finished.get(guild_id)
+    if finished_at is not None:
+        return await ctx.send(
+            f"This server was updated {int(time.time() - finished_at)} seconds ago, "
+            "please try again shortly.",
+        )
+    users = db.get_guild_tracked_users(guild_id)
+    if not users:
         return await ctx.send("No users tracked in this server. Use !track.")
-    for doc in doc_list:
-        old_tier = doc.get("tier")
-        old_rank = doc.get("rank")
-        old_lp = doc.get("LP")
-        puuid = doc.get("puuid")
-        data = await get_ranked_info(bot.session, puuid, RIOT_API_KEY)
-        new_tier = data.get("tier")
-        new_rank = data.get("rank")
-        new_lp = data.get("LP")
-        doc.reference.update(data)
-        if old_tier == new_tier and old_rank == new_rank and old_lp == new_lp:
-            continue
-        riot_id = doc.get("riot_id")
-        match_info = await get_recent_match_info(bot.session, puuid, RIOT_API_KEY)
-        processed_match_info = extract_match_info(match_info, puuid)
-        ranked_data = {
-            "old_tier": old_tier,
-            "old_rank": old_rank,
-            "old_lp": old_lp,
-            "new_tier": new_tier,
-            "new_rank": new_rank,
-            "new_lp": new_lp,
-        }
-        view = MatchDetailsView(processed_match_info, ranked_data, riot_id, puuid)
-        initial_embed = view.create_minimized_embed()
-        message = await ctx.send(embed=initial_embed, view=view)
-        view.message = message
-    return await ctx.send("Ranked information has been updated")
+    new_correlation_id("update")
+    job = asyncio.ensure_future(run_guild_update(ctx, users))
+    bot.guild_updates_running[guild_id] = job
+    try:
+        await job
+    finally:
+        bot.guild_updates_running.pop(guild_id, None)
+        bot.guild_updates_finished.set(guild_id, time.time())
 
 
 @bot.command(name="leaderboard", help="Prints the servers leaderboard of tracked users")
@@ -518,19 +824,12 @@ async def leaderboard(ctx):
     """
     if db is None:
         return await ctx.send("Database Error")
-    guild_id_str = str(ctx.guild.id)
     # DB handling
-    docs = (
-        db.collection(TRACKED_USERS_COLLECTION)
-        .where(filter=FieldFilter("guild_ids", "array_contains", guild_id_str))
-        .stream()
-    )
-    doc_list = list(docs)
-    if not doc_list:
+    users = db.get_guild_tracked_users(ctx.guild.id)
+    if not users:
         return await ctx.send("No users tracked in this server. Use !track.")
     leaderboard_data = []
-    for doc in doc_list:
-        data = doc.to_dict()
+    for data in users:
         leaderboard_data.append(
             {
                 "name": data.get("riot_id"),
@@ -569,6 +868,277 @@ async def leaderboard(ctx):
     await ctx.send(embed=embed)
 
 
+@bot.command()
+async def history(ctx, *, riot_id):
+    """Shows how a tracked user's LP has moved recently.
+
+    Usage: !history <riotid>
+    Summarizes the last 7 days of a tracked user's ranked history this season:
+    net LP, peak rank and the number of recorded rank changes.
+    """
+    if db is None:
+        return await ctx.send("Database Error")
+    parsed = parse_riot_id(riot_id)
+    if not parsed:
+        return await ctx.send(
+            "Invalid input, please ensure syntax is: !history username#tagline",
+        )
+    doc_id = f"{parsed[0]}#{parsed[1]}"
+    user = db.get_tracked_user(doc_id)
+    if user is None:
+        return await ctx.send(f"{doc_id} is not being tracked. Use !track first.")
+    now = time.time()
+    chunks = db.get_lp_history(user.get("puuid"), current_season(now))
+    weekly = summarize_history(chunks, now - HISTORY_WINDOW_SECONDS)
+    if weekly is None:
+        return await ctx.send(f"No ranked history recorded for {doc_id} yet.")
+    season = summarize_history(chunks, 0)
+    embed = discord.Embed(
+        title=f"📈 LP History for {user.get('riot_id')}",
+        color=discord.Color.blue(),
+    )
+    embed.add_field(
+        name="Current",
+        value=describe_score(weekly["current"]),
+        inline=False,
+    )
+    embed.add_field(
+        name="Last 7 Days",
+        value=(
+            f"Net: {weekly['net']:+} LP\n"
+            f"Peak: {describe_score(weekly['peak'])}\n"
+            f"Rank changes: {weekly['changes']}"
+        ),
+        inline=False,
+    )
+    embed.add_field(
+        name="Season Peak",
+        value=describe_score(season["peak"]),
+        inline=False,
+    )
+    await ctx.send(embed=embed)
+
+
+@bot.command()
+async def graph(ctx, *, riot_id):
+    """Draws a tracked user's LP over time this season.
+
+    Usage: !graph <riotid>
+    Posts a chart of every rank change recorded for the user this season.
+    """
+    if db is None:
+        return await ctx.send("Database Error")
+    parsed = parse_riot_id(riot_id)
+    if not parsed:
+        return await ctx.send(
+            "Invalid input, please ensure syntax is: !graph username#tagline",
+        )
+    doc_id = f"{parsed[0]}#{parsed[1]}"
+    user = db.get_tracked_user(doc_id)
+    if user is None:
+        return await ctx.send(f"{doc_id} is not being tracked. Use !track first.")
+    puuid = user.get("puuid")
+    chunks = db.get_lp_history(puuid, current_season())
+    if not chunks:
+        return await ctx.send(f"No ranked history recorded for {doc_id} yet.")
+    timestamps, scores = series_points(chunks)
+    tick_positions, tick_labels = division_ticks(min(scores), max(scores))
+    image = await bot.graph_renderer.render(
+        puuid,
+        series_version(chunks),
+        f"LP History for {user.get('riot_id')}",
+        timestamps,
+        scores,
+        tick_positions,
+        tick_labels,
+    )
+    file = discord.File(io.BytesIO(image), filename="lp_graph.png")
+    embed = discord.Embed(
+        title=f"📈 LP Graph for {user.get('riot_id')}",
+        color=discord.Color.blue(),
+    )
+    embed.set_image(url="attachment://lp_graph.png")
+    await ctx.send(embed=embed, file=file)
+
+
+@bot.command()
+async def scout(ctx, *, riot_id):
+    """Scouts a player's recent ranked games before champ select.
+
+    Usage: !scout <riotid> [N]
+    Looks at the player's last N ranked solo queue games (10 by default, up to 30)
+    and summarizes their champion pool, win rates, roles and KDA.
+    """
+    riot_id, count = split_count_argument(
+        riot_id,
+        SCOUT_DEFAULT_MATCHES,
+        SCOUT_MAX_MATCHES,
+    )
+    parsed = parse_riot_id(riot_id)
+    if not parsed:
+        return await ctx.send(
+            "Invalid input, please ensure syntax is: !scout username#tagline [N]",
+        )
+    username, tagline = parsed
+    puuid = await resolve_puuid(username, tagline)
+    cache_key = (puuid, count)
+    report = bot.scout_cache.get(cache_key)
+    if report is None:
+        match_ids = await get_match_ids(bot.session, puuid, RIOT_API_KEY, count)
+        # Only matches the warehouse has not seen yet are fetched from Riot
+        missing = [m for m in match_ids if not bot.warehouse.has_match(m)]
+        if missing:
+            matches = await get_matches(
+                bot.session,
+                missing,
+                RIOT_API_KEY,
+                hedge_after=MATCH_HEDGE_SECONDS,
+            )
+            for match in matches:
+                bot.warehouse.add_match(match)
+        # Queries only see flushed rows, and the sweep and post-game checks
+        # buffer the newest matches without flushing them
+        await asyncio.to_thread(bot.warehouse.flush)
+        report = aggregate_scouting(bot.warehouse.player_columns(puuid, match_ids))
+        bot.scout_cache.set(cache_key, report)
+    if report is None:
+        return await ctx.send(f"No recent ranked games found for {riot_id.strip()}.")
+    embed = discord.Embed(
+        title=f"🔍 Scouting {username}#{tagline}",
+        description=(
+            f"Last {report['games']} ranked games: "
+            f"{report['win_rate']:.0%} WR, {report['kda']:.2f} KDA"
+        ),
+        color=discord.Color.teal(),
+    )
+    champion_lines = [
+        f"**{c['champion']}** - {c['games']} games, "
+        f"{c['win_rate']:.0%} WR, {c['kda']:.2f} KDA"
+        for c in report["champions"][:SCOUT_TOP_CHAMPIONS]
+    ]
+    embed.add_field(
+        name="Champion Pool",
+        value="\n".join(champion_lines),
+        inline=False,
+    )
+    embed.add_field(
+        name="Roles",
+        value=", ".join(f"{role} {share:.0%}" for role, share in report["roles"]),
+        inline=False,
+    )
+    await ctx.send(embed=embed)
+
+
+@bot.command()
+async def lobby(ctx, *, riot_ids):
+    """Looks up the ranks of a whole lobby at once.
+
+    Usage: !lobby <riotid1>, <riotid2>, ...
+    Given up to 10 comma separated riotids, shows every player's solo queue rank
+    and their highest mastery champions in a single message.
+    """
+    entries = [entry for entry in riot_ids.split(",") if entry.strip()]
+    if len(entries) > LOBBY_MAX_PLAYERS:
+        return await ctx.send(f"Please provide at most {LOBBY_MAX_PLAYERS} riotids.")
+    players = []
+    invalid = []
+    for entry in entries:
+        parsed = parse_riot_id(entry)
+        if parsed:
+            players.append(parsed)
+        else:
+            invalid.append(entry.strip())
+    if not players:
+        return await ctx.send(
+            "Invalid input, please ensure syntax is: "
+            "!lobby username#tagline, username#tagline, ...",
+        )
+    # Champion names load alongside the lookups instead of ahead of them
+    results, _ = await asyncio.gather(
+        asyncio.gather(
+            *(lookup_lobby_player(username, tagline) for username, tagline in players),
+            return_exceptions=True,
+        ),
+        ensure_champion_names(),
+    )
+    names = bot.champion_names or {}
+    embed = discord.Embed(title="🎮 Lobby Lookup", color=discord.Color.blurple())
+    for (username, tagline), result in zip(players, results, strict=True):
+        if isinstance(result, UserNotFoundError):
+            value = "Player not found"
+        elif isinstance(result, RiotAPIError):
+            value = f"Riot API issue: {result}"
+        elif isinstance(result, Exception):
+            logger.error(f"❌ ERROR: lobby lookup: {result}", exc_info=result)
+            value = "Lookup failed"
+        else:
+            ranked_data, mastery_ids = result
+            mastery = [
+                names.get(champion_id, str(champion_id)) for champion_id in mastery_ids
+            ]
+            value = (
+                f"{ranked_data['tier']} {ranked_data['rank']} ({ranked_data['LP']} LP)"
+            )
+            if mastery:
+                value += f"\nMains: {', '.join(mastery)}"
+        embed.add_field(name=f"{username}#{tagline}", value=value, inline=False)
+    if invalid:
+        embed.set_footer(text=f"Skipped invalid riotids: {', '.join(invalid)}")
+    await ctx.send(embed=embed)
+
+
+@bot.command(hidden=True)
+@commands.is_owner()
+async def backfill(ctx, count: int = BACKFILL_DEFAULT_MATCHES):
+    """Stores the recent ranked matches of every tracked user locally.
+
+    Usage: !backfill [N]
+    Owner only. Pulls the last N ranked matches (20 by default, up to 100) of each
+    tracked user into the local match warehouse used by !scout.
+    """
+    if db is None:
+        return await ctx.send("Database Error")
+    count = max(1, min(count, BACKFILL_MAX_MATCHES))
+    puuids = sorted({user.get("puuid") for user in db.get_all_tracked_users()})
+    await ctx.send(f"Backfilling {count} matches for {len(puuids)} players...")
+    added = await backfill_matches(
+        bot.session,
+        bot.warehouse,
+        puuids,
+        RIOT_API_KEY,
+        count,
+    )
+    await ctx.send(f"Backfill complete, {added} new matches stored.")
+
+
+@bot.command(hidden=True)
+@commands.is_owner()
+async def profile(ctx, target="sweep", runs: int = 1):
+    """Captures a sampling profile of the next background sweeps or commands.
+
+    Usage: !profile [sweep|commands] [N]
+    Owner only. Samples the event loop during the next N runs (1 by default, up to
+    20), then saves a folded flamegraph profile and posts the top functions here.
+    """
+    if target not in PROFILE_TARGETS:
+        return await ctx.send(f"Target must be one of: {', '.join(PROFILE_TARGETS)}")
+    runs = max(1, min(runs, PROFILE_MAX_RUNS))
+    if not bot.profile_capture.arm(target, runs, threading.get_ident(), ctx.channel):
+        return await ctx.send("A profile is already being captured.")
+    label = "background sweeps" if target == "sweep" else "command invocations"
+    await ctx.send(f"Profiling the next {runs} {label}...")
+
+
+@bot.before_invoke
+async def profile_command_start(_ctx):
+    bot.profile_capture.begin("commands")
+
+
+@bot.after_invoke
+async def profile_command_end(_ctx):
+    await finish_profile(bot.profile_capture.end("commands"))
+
+
 @bot.command()
 async def set_update_channel(ctx):
     """Defaults automatic rank updates to post in this channel.
@@ -580,9 +1150,8 @@ async def set_update_channel(ctx):
     """
     if db is None:
         return await ctx.send("Database Error")
-    doc_ref = db.collection(GUILD_CONFIG_COLLECTION).document(str(ctx.guild.id))
     try:
-        doc_ref.set({"channel_id": ctx.channel.id}, merge=True)
+        db.set_update_channel(ctx.guild.id, ctx.channel.id)
         await ctx.send("Rank updates will now be posted in this channel")
     except Exception as e:
         logger.exception(f"❌ ERROR: setting guild config: {e}")
@@ -621,6 +1190,341 @@ def extract_minimized_embed_description(ranked_data, riot_id):
         # this case only happens when both old and new ranked information are identical
         return "This update should not have happened, WHOOPS!"
 
+async def get_update_channels(guild_ids):
+    """Returns the rank update channels configured for the given guilds."""
+    channels = []
+    for guild in guild_ids:
+        try:
+            channel_id = db.get_update_channel(guild)
+            if channel_id:
+                channel = bot.get_channel(channel_id)
+                if channel is None:
+                    # The guild lives on a shard run by another process
+                    with contextlib.suppress(discord.NotFound, discord.Forbidden):
+                        channel = await bot.fetch_channel(channel_id)
+                if channel:
+                    channels.append(channel)
+        except Exception as e:
+            logger.exception(f"❌ ERROR: fetching config for guild {guild}: {e}")
+    return channels
+
+
+async def refresh_tracked_user(user, channels=None):
+    """Polls a tracked user's rank and posts an update if it moved.
+
+    Args:
+        user: The tracked user, as returned by the storage backend.
+        channels: Where to post the update. Defaults to the update channels of
+            every guild tracking the user.
+
+    Returns:
+        The old and new rank (``old_tier``, ``new_lp``, ...) if it changed since
+        it was last stored, otherwise None.
+    """
+    old_tier = user.get("tier")
+    old_rank = user.get("rank")
+    old_lp = user.get("LP")
+    puuid = user.get("puuid")
+    riot_id = user.get("riot_id")
+    data = await get_ranked_info(bot.session, puuid, RIOT_API_KEY)
+    new_tier = data.get("tier")
+    new_rank = data.get("rank")
+    new_lp = data.get("LP")
+    now = time.time()
+    db.update_ranked_info(riot_id, data, polled_at=now)
+    if old_tier == new_tier and old_rank == new_rank and old_lp == new_lp:
+        return None
+    record_lp_history(puuid, data)
+    bot.live_tracker.mark_active(puuid, now)
+    ranked_data = {
+        "old_tier": old_tier,
+        "old_rank": old_rank,
+        "old_lp": old_lp,
+        "new_tier": new_tier,
+        "new_rank": new_rank,
+        "new_lp": new_lp,
+    }
+    if channels is None:
+        channels = await get_update_channels(user.get("guild_ids", []))
+    if not channels:
+        return ranked_data
+    match_info = await get_recent_match_info(bot.session, puuid, RIOT_API_KEY)
+    bot.warehouse.add_match(match_info)
+    processed_match_info = extract_match_info(match_info, puuid)
+    for channel in channels:
+        view = MatchDetailsView(processed_match_info, ranked_data, riot_id, puuid)
+        initial_embed = view.create_minimized_embed()
+        message = await channel.send(embed=initial_embed, view=view)
+        view.message = message
+    return ranked_data
+
+
+async def finish_profile(capture):
+    """Saves a completed profile capture and reports its summary."""
+    if capture is None:
+        return
+    target, profiler, channel = capture
+    try:
+        path = await asyncio.to_thread(profiler.save, PROFILE_DIR, target)
+    except OSError as e:
+        logger.exception(f"❌ ERROR: saving profile: {e}")
+        path = None
+    summary = profiler.summary()
+    logger.info(f"🔬 Profile saved to {path}\n{summary}")
+    if channel is not None:
+        header = f"Profile saved to `{path}`" if path else "Profile could not be saved"
+        body = truncate_lines(
+            summary.splitlines(),
+            DISCORD_MESSAGE_LIMIT - len(header) - 10,
+        )
+        await channel.send(f"{header}\n```\n{body}\n```")
+
+
+async def run_guild_update(ctx, users):
+    """Refreshes a guild's tracked users, reporting progress in one message.
+
+    Users refreshed within the staleness window are reused as-is, the others are
+    refreshed concurrently. Rank changes are listed in the final status message
+    rather than posted one by one.
+    """
+    now = time.time()
+    stale = [
+        user
+        for user in users
+        if not is_recently_polled(user, now, UPDATE_STALENESS_SECONDS)
+    ]
+    reused = len(users) - len(stale)
+    progress = {"done": 0, "failed": 0, "edited_at": now}
+    changes = []
+
+    def status_text():
+        return (
+            f"Updating ranked information... {progress['done']}/{len(stale)} "
+            f"refreshed, {reused} already up to date"
+        )
+
+    status = await ctx.send(status_text())
+    semaphore = asyncio.Semaphore(UPDATE_CONCURRENCY)
+
+    async def refresh(user):
+        try:
+            async with semaphore:
+                change = await refresh_tracked_user(user, channels=[])
+            if change:
+                changes.append(format_rank_change(user.get("riot_id"), change))
+        except Exception as e:
+            progress["failed"] += 1
+            logger.warning(f"⚠️ Update failed for {user.get('riot_id')}: {e}")
+        progress["done"] += 1
+        # Editing on every completion would run into Discord's rate limits
+        if time.time() - progress["edited_at"] >= UPDATE_PROGRESS_EDIT_SECONDS:
+            progress["edited_at"] = time.time()
+            with contextlib.suppress(discord.HTTPException):
+                await status.edit(content=status_text())
+
+    await asyncio.gather(*(refresh(user) for user in stale))
+    await asyncio.to_thread(bot.warehouse.flush)
+    summary = (
+        f"Ranked information has been updated: {len(stale)} refreshed, "
+        f"{reused} already up to date, {len(changes)} changed"
+    )
+    if progress["failed"]:
+        summary += f", {progress['failed']} failed"
+    if changes:
+        summary += "\n" + truncate_lines(
+            sorted(changes),
+            DISCORD_MESSAGE_LIMIT - len(summary) - 1,
+        )
+    await status.edit(content=summary)
+
+
+def format_rank_change(riot_id, change):
+    old = f"{change['old_tier']} {change['old_rank']} {change['old_lp']} LP"
+    new = f"{change['new_tier']} {change['new_rank']} {change['new_lp']} LP"
+    return f"{riot_id}: {old} → {new}"
+
+
+async def ensure_champion_names():
+    if bot.champion_names is None:
+        try:
+            bot.champion_names = await get_champion_names(bot.session)
+        except RiotAPIError as e:
+            logger.warning(f"⚠️ Could not load champion names: {e}")
+
+
+async def announce_live_game(user, game):
+    """Posts an in-game notice with every lobby player's rank."""
+    game_id = game.get("gameId")
+    channels = [
+        channel
+        for channel in await get_update_channels(user.get("guild_ids", []))
+        if bot.announced_games.get((game_id, channel.id)) is None
+    ]
+    if not channels:
+        return
+    participants = game.get("participants", [])
+    ranks, _ = await asyncio.gather(
+        asyncio.gather(
+            *(
+                get_ranked_info(bot.session, p.get("puuid"), RIOT_API_KEY)
+                for p in participants
+            ),
+            return_exceptions=True,
+        ),
+        ensure_champion_names(),
+    )
+    embed = build_live_game_embed(
+        user.get("riot_id"),
+        participants,
+        ranks,
+        bot.champion_names or {},
+    )
+    for channel in channels:
+        await channel.send(embed=embed)
+        bot.announced_games.set((game_id, channel.id), True)
+
+
+def build_live_game_embed(riot_id, participants, ranks, champion_names):
+    teams = {100: [], 200: []}
+    for p, ranked_data in zip(participants, ranks, strict=True):
+        champion_id = p.get("championId")
+        champion = champion_names.get(champion_id, str(champion_id))
+        if isinstance(ranked_data, Exception):
+            rank = "Unknown rank"
+        else:
+            rank = (
+                f"{ranked_data['tier']} {ranked_data['rank']} ({ranked_data['LP']} LP)"
+            )
+        line = f"**{p.get('riotId', 'Unknown')}** - {champion} - {rank}"
+        teams.setdefault(p.get("teamId"), []).append(line)
+    embed = discord.Embed(
+        title="🔴 Live Game",
+        description=f"{riot_id} is in game!",
+        color=discord.Color.red(),
+    )
+    embed.add_field(
+        name="🟦 Blue Team",
+        value="\n".join(teams[100]) or "-",
+        inline=False,
+    )
+    embed.add_field(
+        name="🟥 Red Team",
+        value="\n".join(teams[200]) or "-",
+        inline=False,
+    )
+    return embed
+
+
+async def resolve_puuid(username, tagline):
+    """Resolves a riotid to a puuid, reusing earlier lookups where possible."""
+    riot_id = f"{username}#{tagline}"
+    puuid = bot.puuid_cache.get(riot_id)
+    if puuid is None and db is not None:
+        user = db.get_tracked_user(riot_id)
+        puuid = user.get("puuid") if user else None
+    if puuid is None:
+        puuid = await get_puuid(bot.session, username, tagline, RIOT_API_KEY)
+    bot.puuid_cache.set(riot_id, puuid)
+    return puuid
+
+
+async def lookup_lobby_player(username, tagline):
+    """Fetches a lobby player's rank and top mastery champion ids concurrently."""
+    puuid = await resolve_puuid(username, tagline)
+    ranked_data, mastery_ids = await asyncio.gather(
+        get_ranked_info(bot.session, puuid, RIOT_API_KEY),
+        get_top_mastery(bot.session, puuid, RIOT_API_KEY, LOBBY_TOP_MASTERY),
+        return_exceptions=True,
+    )
+    if isinstance(ranked_data, BaseException):
+        raise ranked_data
+    if isinstance(mastery_ids, BaseException):
+        # Mastery is a nice-to-have, the rank is what the lobby needs
+        logger.warning(f"⚠️ Could not fetch mastery for {username}#{tagline}")
+        mastery_ids = []
+    return ranked_data, mastery_ids
+
+
+def split_riot_id_list(text):
+    """Splits comma, new line or CSV separated riotids, dropping duplicates."""
+    entries = []
+    for row in csv.reader(text.splitlines()):
+        for cell in row:
+            cell = cell.strip()
+            if cell and cell not in entries:
+                entries.append(cell)
+    return entries
+
+
+def truncate_lines(lines, limit):
+    """Joins lines into one message, replacing what does not fit with a count."""
+    message = ""
+    for i, line in enumerate(lines):
+        candidate = f"{message}\n{line}" if message else line
+        # Leave room for the "...and N more" line unless this is the last line
+        reserve = 20 if i < len(lines) - 1 else 0
+        if len(candidate) + reserve > limit:
+            return f"{message}\n...and {len(lines) - i} more"
+        message = candidate
+    return message
+
+
+def split_count_argument(text, default, maximum):
+    """Splits an optional trailing count off a command argument.
+
+    Returns:
+        The remaining text and the count, clamped to [1, maximum].
+    """
+    head, _, tail = text.strip().rpartition(" ")
+    if head and tail.isdigit():
+        return head, max(1, min(int(tail), maximum))
+    return text, default
+
+
+def record_lp_history(puuid, ranked_data):
+    """Appends the player's current ladder position to their LP history."""
+    score = ladder_score(
+        ranked_data.get("tier"),
+        ranked_data.get("rank"),
+        ranked_data.get("LP"),
+    )
+    if score is None:
+        return
+    now = time.time()
+    season = current_season(now)
+    try:
+        # Only the last chunk changes, the rest of the season stays untouched
+        latest = db.get_latest_lp_history_chunk(puuid, season)
+        if latest is not None and latest["last_score"] == score:
+            # e.g. re-tracking a player from another guild, nothing moved
+            return
+        chunks = [] if latest is None else [latest]
+        db.save_lp_history_chunk(append_point(chunks, puuid, season, now, score))
+    except Exception as e:
+        logger.exception(f"❌ ERROR: recording LP history for {puuid}: {e}")
+
+
+def order_users_for_sweep(users, cursor):
+    """Rotates the riot_id-ordered user list so the sweep resumes after ``cursor``.
+
+    Players after the cursor come first, followed by the ones the previous
+    (interrupted) sweep already covered.
+    """
+    users = sorted(users, key=lambda u: u.get("riot_id"))
+    if cursor is None:
+        return users
+    split = next(
+        (i for i, u in enumerate(users) if u.get("riot_id") > cursor),
+        len(users),
+    )
+    return users[split:] + users[:split]
+
+
+def is_recently_polled(user, now, min_interval=MIN_POLL_INTERVAL_SECONDS):
+    last_polled = user.get("last_polled")
+    return last_polled is not None and now - last_polled < min_interval
+
+
 def bot_startup():
     try:
         bot.run(DISCORD_KEY)
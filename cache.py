@@ -0,0 +1,60 @@
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Small in-memory LRU cache with an optional per-entry time to live.
+
+    Entries expire ``ttl`` seconds after being set (never when ``ttl`` is None),
+    and the least recently used entry is evicted once ``maxsize`` is reached.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        expires_at = None if self.ttl is None else time.time() + self.ttl
+        self._data[key] = (value, expires_at)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        entry = self._data.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        self._data.clear()
+
+    def entries(self):
+        """Returns the live (key, value, expires_at) entries, least recent first."""
+        now = time.time()
+        return [
+            (key, value, expires_at)
+            for key, (value, expires_at) in self._data.items()
+            if expires_at is None or expires_at > now
+        ]
+
+    def restore(self, entries):
+        """Re-inserts entries from ``entries``, keeping their original expiry."""
+        now = time.time()
+        for key, value, expires_at in entries:
+            if expires_at is not None and expires_at <= now:
+                continue
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
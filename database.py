@@ -1,9 +1,10 @@
+import abc
 import base64
 import json
 import os
-
-import firebase_admin
-from firebase_admin import credentials, firestore
+import sqlite3
+import threading
+from array import array
 
 from logger_config import logger
 
@@ -11,9 +12,703 @@ from logger_config import logger
 
 TRACKED_USERS_COLLECTION = "tracked_users"
 GUILD_CONFIG_COLLECTION = "guild_config"
+BOT_STATE_COLLECTION = "bot_state"
+LP_HISTORY_COLLECTION = "lp_history"
+# One "<puuid>_<season>" doc per series pointing at its latest chunk, so finding
+# it is a key lookup instead of a query needing a composite index
+LP_HISTORY_HEADS_COLLECTION = "lp_history_heads"
+PARTITION_LEASES_COLLECTION = "partition_leases"
+WORKERS_COLLECTION = "workers"
+DEFAULT_SQLITE_PATH = "leaguehelper.db"
+FIRESTORE_BATCH_LIMIT = 500  # most writes Firestore accepts in one batch
 
 
-def database_startup():
+# Storage Interface
+
+
+class Storage(abc.ABC):
+    """Backend-agnostic access to tracked users, guild membership and guild config.
+
+    Tracked users are returned as plain dicts with the keys ``riot_id``,
+    ``puuid``, ``tier``, ``rank``, ``LP``, ``guild_ids``, ``server_info`` and
+    ``last_polled`` (unix timestamp of the last ranked refresh, or None).
+    """
+
+    @abc.abstractmethod
+    def get_tracked_user(self, riot_id):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_all_tracked_users(self):
+        """Returns every tracked user, ordered by riot_id."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_guild_tracked_users(self, guild_id):
+        raise NotImplementedError
+
+    def track_user(self, riot_id, puuid, ranked_data, guild_id, added_by):
+        self.track_users([(riot_id, puuid, ranked_data)], guild_id, added_by)
+
+    @abc.abstractmethod
+    def track_users(self, entries, guild_id, added_by):
+        """Tracks several users in a guild with a single batched write.
+
+        Args:
+            entries: (riot_id, puuid, ranked_data) tuples.
+            guild_id: The guild the users are tracked in.
+            added_by: The Discord id of the member who added them.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def untrack_user(self, riot_id, guild_id):
+        """Removes a guild from a tracked user.
+
+        Returns:
+            False if the user was not tracked in this guild, True otherwise. The
+            user is deleted entirely once no guild tracks them anymore.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def update_ranked_info(self, riot_id, ranked_data, polled_at=None):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_update_channel(self, guild_id):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_update_channel(self, guild_id, channel_id):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_bot_state(self, key):
+        """Returns the dict stored under ``key``, or None if nothing is stored."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def set_bot_state(self, key, value):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_lp_history(self, puuid, season):
+        """Returns a player's LP history chunks for ``season``, ordered by index."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_latest_lp_history_chunk(self, puuid, season):
+        """Returns the highest-index chunk of a player's season, or None."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def save_lp_history_chunk(self, chunk):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_partition_leases(self):
+        """Returns {partition: {"owner": worker_id, "expires_at": timestamp}}."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def try_acquire_partition_lease(self, partition, worker_id, now, expires_at):
+        """Atomically takes or renews a lease.
+
+        Returns:
+            True if ``worker_id`` holds the lease until ``expires_at``, False if
+            another worker holds an unexpired lease on the partition.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def release_partition_lease(self, partition, worker_id):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def register_worker(self, worker_id, expires_at):
+        """Records that ``worker_id`` is alive until ``expires_at``."""
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def get_live_workers(self, now):
+        raise NotImplementedError
+
+
+# Firestore Backend
+
+# Documents written before the storage layer kept each guild's info in a
+# literal top-level field named "server_info.<guild_id>" rather than in the
+# server_info map. They are folded into the map on read and removed on write.
+LEGACY_SERVER_INFO_PREFIX = "server_info."
+
+
+def normalize_user_doc(data):
+    """Moves legacy ``server_info.<guild_id>`` fields into the server_info map."""
+    legacy_keys = [key for key in data if key.startswith(LEGACY_SERVER_INFO_PREFIX)]
+    if legacy_keys:
+        server_info = data.setdefault("server_info", {})
+        for key in legacy_keys:
+            guild_id = key.removeprefix(LEGACY_SERVER_INFO_PREFIX)
+            server_info.setdefault(guild_id, data.pop(key))
+    return data
+
+
+def lp_history_chunk_id(puuid, season, index):
+    return f"{puuid}_{season}_{index:04d}"
+
+
+class FirestoreStorage(Storage):
+    def __init__(self, client):
+        self.client = client
+
+    def _users(self):
+        return self.client.collection(TRACKED_USERS_COLLECTION)
+
+    def get_tracked_user(self, riot_id):
+        doc = self._users().document(riot_id).get()
+        if not doc.exists:
+            return None
+        return normalize_user_doc(doc.to_dict())
+
+    def get_all_tracked_users(self):
+        return [normalize_user_doc(doc.to_dict()) for doc in self._users().stream()]
+
+    def get_guild_tracked_users(self, guild_id):
+        from google.cloud.firestore import FieldFilter
+
+        docs = self._users().where(
+            filter=FieldFilter("guild_ids", "array_contains", str(guild_id)),
+        )
+        return [normalize_user_doc(doc.to_dict()) for doc in docs.stream()]
+
+    def track_users(self, entries, guild_id, added_by):
+        from firebase_admin import firestore
+
+        guild_id_str = str(guild_id)
+        for start in range(0, len(entries), FIRESTORE_BATCH_LIMIT):
+            batch = self.client.batch()
+            for riot_id, puuid, ranked_data in entries[
+                start : start + FIRESTORE_BATCH_LIMIT
+            ]:
+                batch.set(
+                    self._users().document(riot_id),
+                    {
+                        "riot_id": riot_id,
+                        "puuid": puuid,
+                        "tier": f"{ranked_data.get('tier')}",
+                        "rank": f"{ranked_data.get('rank')}",
+                        "LP": ranked_data.get("LP"),
+                        "guild_ids": firestore.ArrayUnion([guild_id_str]),
+                        "server_info": {guild_id_str: {"added_by": added_by}},
+                        f"{LEGACY_SERVER_INFO_PREFIX}{guild_id_str}": (
+                            firestore.DELETE_FIELD
+                        ),
+                    },
+                    merge=True,
+                )
+            batch.commit()
+
+    def untrack_user(self, riot_id, guild_id):
+        guild_id_str = str(guild_id)
+        doc_ref = self._users().document(riot_id)
+        doc = doc_ref.get()
+        if not doc.exists:
+            return False
+        # Rewriting the whole document below also drops any legacy fields
+        data = normalize_user_doc(doc.to_dict())
+        guild_list = data.get("guild_ids", [])
+        if guild_id_str not in guild_list:
+            return False
+        guild_list.remove(guild_id_str)
+        if not guild_list:
+            # We are the only server left, delete the whole file
+            doc_ref.delete()
+        else:
+            data["guild_ids"] = guild_list
+            data.get("server_info", {}).pop(guild_id_str, None)
+            doc_ref.set(data)
+        return True
+
+    def update_ranked_info(self, riot_id, ranked_data, polled_at=None):
+        data = dict(ranked_data)
+        if polled_at is not None:
+            data["last_polled"] = polled_at
+        self._users().document(riot_id).update(data)
+
+    def get_update_channel(self, guild_id):
+        config = (
+            self.client.collection(GUILD_CONFIG_COLLECTION)
+            .document(str(guild_id))
+            .get()
+        )
+        if not config.exists:
+            return None
+        return config.to_dict().get("channel_id")
+
+    def set_update_channel(self, guild_id, channel_id):
+        self.client.collection(GUILD_CONFIG_COLLECTION).document(str(guild_id)).set(
+            {"channel_id": channel_id},
+            merge=True,
+        )
+
+    def get_bot_state(self, key):
+        doc = self.client.collection(BOT_STATE_COLLECTION).document(key).get()
+        if not doc.exists:
+            return None
+        return doc.to_dict()
+
+    def set_bot_state(self, key, value):
+        self.client.collection(BOT_STATE_COLLECTION).document(key).set(value)
+
+    def get_lp_history(self, puuid, season):
+        from google.cloud.firestore import FieldFilter
+
+        docs = (
+            self.client.collection(LP_HISTORY_COLLECTION)
+            .where(filter=FieldFilter("puuid", "==", puuid))
+            .where(filter=FieldFilter("season", "==", season))
+            .stream()
+        )
+        return sorted((doc.to_dict() for doc in docs), key=lambda c: c["index"])
+
+    def get_latest_lp_history_chunk(self, puuid, season):
+        head = (
+            self.client.collection(LP_HISTORY_HEADS_COLLECTION)
+            .document(f"{puuid}_{season}")
+            .get()
+        )
+        if not head.exists:
+            # Series written before head docs existed, saving the next point
+            # adds one
+            chunks = self.get_lp_history(puuid, season)
+            return chunks[-1] if chunks else None
+        doc = (
+            self.client.collection(LP_HISTORY_COLLECTION)
+            .document(lp_history_chunk_id(puuid, season, head.to_dict()["index"]))
+            .get()
+        )
+        return doc.to_dict() if doc.exists else None
+
+    def save_lp_history_chunk(self, chunk):
+        puuid, season, index = chunk["puuid"], chunk["season"], chunk["index"]
+        batch = self.client.batch()
+        batch.set(
+            self.client.collection(LP_HISTORY_COLLECTION).document(
+                lp_history_chunk_id(puuid, season, index),
+            ),
+            chunk,
+        )
+        batch.set(
+            self.client.collection(LP_HISTORY_HEADS_COLLECTION).document(
+                f"{puuid}_{season}",
+            ),
+            {"puuid": puuid, "season": season, "index": index},
+        )
+        batch.commit()
+
+    def get_partition_leases(self):
+        docs = self.client.collection(PARTITION_LEASES_COLLECTION).stream()
+        return {int(doc.id): doc.to_dict() for doc in docs}
+
+    def try_acquire_partition_lease(self, partition, worker_id, now, expires_at):
+        from firebase_admin import firestore
+
+        doc_ref = self.client.collection(PARTITION_LEASES_COLLECTION).document(
+            str(partition),
+        )
+
+        @firestore.transactional
+        def acquire(transaction):
+            doc = doc_ref.get(transaction=transaction)
+            if doc.exists:
+                lease = doc.to_dict()
+                if lease["owner"] != worker_id and lease["expires_at"] > now:
+                    return False
+            transaction.set(doc_ref, {"owner": worker_id, "expires_at": expires_at})
+            return True
+
+        return acquire(self.client.transaction())
+
+    def release_partition_lease(self, partition, worker_id):
+        from firebase_admin import firestore
+
+        doc_ref = self.client.collection(PARTITION_LEASES_COLLECTION).document(
+            str(partition),
+        )
+
+        @firestore.transactional
+        def release(transaction):
+            doc = doc_ref.get(transaction=transaction)
+            if doc.exists and doc.to_dict()["owner"] == worker_id:
+                transaction.delete(doc_ref)
+
+        release(self.client.transaction())
+
+    def register_worker(self, worker_id, expires_at):
+        self.client.collection(WORKERS_COLLECTION).document(worker_id).set(
+            {"expires_at": expires_at},
+        )
+
+    def get_live_workers(self, now):
+        from google.cloud.firestore import FieldFilter
+
+        docs = (
+            self.client.collection(WORKERS_COLLECTION)
+            .where(filter=FieldFilter("expires_at", ">", now))
+            .stream()
+        )
+        return {doc.id for doc in docs}
+
+
+# SQLite Backend
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracked_users (
+    riot_id TEXT PRIMARY KEY,
+    puuid TEXT NOT NULL,
+    tier TEXT NOT NULL DEFAULT 'UNRANKED',
+    rank TEXT NOT NULL DEFAULT '',
+    lp INTEGER NOT NULL DEFAULT 0,
+    last_polled REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tracked_users_puuid ON tracked_users (puuid);
+
+CREATE TABLE IF NOT EXISTS guild_members (
+    riot_id TEXT NOT NULL REFERENCES tracked_users (riot_id) ON DELETE CASCADE,
+    guild_id TEXT NOT NULL,
+    added_by INTEGER,
+    PRIMARY KEY (riot_id, guild_id)
+);
+CREATE INDEX IF NOT EXISTS idx_guild_members_guild_id ON guild_members (guild_id);
+
+CREATE TABLE IF NOT EXISTS guild_config (
+    guild_id TEXT PRIMARY KEY,
+    channel_id INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS bot_state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS lp_history (
+    puuid TEXT NOT NULL,
+    season TEXT NOT NULL,
+    chunk_index INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    start_ts INTEGER NOT NULL,
+    end_ts INTEGER NOT NULL,
+    first_score INTEGER NOT NULL,
+    last_score INTEGER NOT NULL,
+    min_score INTEGER NOT NULL,
+    max_score INTEGER NOT NULL,
+    ts_deltas BLOB NOT NULL,
+    score_deltas BLOB NOT NULL,
+    PRIMARY KEY (puuid, season, chunk_index)
+);
+
+CREATE TABLE IF NOT EXISTS partition_leases (
+    partition INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    expires_at REAL NOT NULL
+);
+"""
+
+# Delta arrays are stored as packed 32-bit integers
+LP_HISTORY_ARRAY_TYPE = "i"
+LP_HISTORY_SUMMARY_COLUMNS = (
+    "count",
+    "start_ts",
+    "end_ts",
+    "first_score",
+    "last_score",
+    "min_score",
+    "max_score",
+)
+
+# Columns added after the first release, as (table, column, definition)
+SQLITE_MIGRATIONS = [
+    ("tracked_users", "last_polled", "REAL"),
+]
+
+
+class SQLiteStorage(Storage):
+    """Local storage engine for self-hosted deployments, tests and benchmarks."""
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        with self.conn:
+            self.conn.executescript(SQLITE_SCHEMA)
+            self._migrate()
+
+    def _migrate(self):
+        for table, column, definition in SQLITE_MIGRATIONS:
+            existing = {
+                row["name"] for row in self.conn.execute(f"PRAGMA table_info({table})")
+            }
+            if column not in existing:
+                self.conn.execute(
+                    f"ALTER TABLE {table} ADD COLUMN {column} {definition}",
+                )
+
+    def close(self):
+        self.conn.close()
+
+    def _build_users(self, rows):
+        """Joins guild membership onto user rows, keeping the Firestore shape."""
+        users = {
+            row["riot_id"]: {
+                "riot_id": row["riot_id"],
+                "puuid": row["puuid"],
+                "tier": row["tier"],
+                "rank": row["rank"],
+                "LP": row["lp"],
+                "last_polled": row["last_polled"],
+                "guild_ids": [],
+                "server_info": {},
+            }
+            for row in rows
+        }
+        if not users:
+            return []
+        placeholders = ",".join("?" * len(users))
+        members = self.conn.execute(
+            "SELECT riot_id, guild_id, added_by FROM guild_members "
+            f"WHERE riot_id IN ({placeholders})",
+            list(users),
+        )
+        for member in members:
+            user = users[member["riot_id"]]
+            user["guild_ids"].append(member["guild_id"])
+            user["server_info"][member["guild_id"]] = {"added_by": member["added_by"]}
+        return list(users.values())
+
+    def get_tracked_user(self, riot_id):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT * FROM tracked_users WHERE riot_id = ?",
+                (riot_id,),
+            ).fetchall()
+            users = self._build_users(rows)
+        return users[0] if users else None
+
+    def get_all_tracked_users(self):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT * FROM tracked_users ORDER BY riot_id",
+            ).fetchall()
+            return self._build_users(rows)
+
+    def get_guild_tracked_users(self, guild_id):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT u.* FROM tracked_users u "
+                "JOIN guild_members m ON m.riot_id = u.riot_id "
+                "WHERE m.guild_id = ? ORDER BY u.riot_id",
+                (str(guild_id),),
+            ).fetchall()
+            return self._build_users(rows)
+
+    def track_users(self, entries, guild_id, added_by):
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT INTO tracked_users (riot_id, puuid, tier, rank, lp) "
+                "VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (riot_id) DO UPDATE SET puuid = excluded.puuid, "
+                "tier = excluded.tier, rank = excluded.rank, lp = excluded.lp",
+                [
+                    (
+                        riot_id,
+                        puuid,
+                        f"{ranked_data.get('tier')}",
+                        f"{ranked_data.get('rank')}",
+                        ranked_data.get("LP"),
+                    )
+                    for riot_id, puuid, ranked_data in entries
+                ],
+            )
+            self.conn.executemany(
+                "INSERT INTO guild_members (riot_id, guild_id, added_by) "
+                "VALUES (?, ?, ?) "
+                "ON CONFLICT (riot_id, guild_id) DO UPDATE "
+                "SET added_by = excluded.added_by",
+                [(riot_id, str(guild_id), added_by) for riot_id, _, _ in entries],
+            )
+
+    def untrack_user(self, riot_id, guild_id):
+        with self._lock, self.conn:
+            deleted = self.conn.execute(
+                "DELETE FROM guild_members WHERE riot_id = ? AND guild_id = ?",
+                (riot_id, str(guild_id)),
+            ).rowcount
+            if not deleted:
+                return False
+            self.conn.execute(
+                "DELETE FROM tracked_users WHERE riot_id = ? AND NOT EXISTS "
+                "(SELECT 1 FROM guild_members WHERE riot_id = ?)",
+                (riot_id, riot_id),
+            )
+        return True
+
+    def update_ranked_info(self, riot_id, ranked_data, polled_at=None):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "UPDATE tracked_users SET tier = ?, rank = ?, lp = ?, "
+                "last_polled = COALESCE(?, last_polled) WHERE riot_id = ?",
+                (
+                    ranked_data.get("tier"),
+                    ranked_data.get("rank"),
+                    ranked_data.get("LP"),
+                    polled_at,
+                    riot_id,
+                ),
+            )
+
+    def get_update_channel(self, guild_id):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT channel_id FROM guild_config WHERE guild_id = ?",
+                (str(guild_id),),
+            ).fetchone()
+        return row["channel_id"] if row else None
+
+    def set_update_channel(self, guild_id, channel_id):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO guild_config (guild_id, channel_id) VALUES (?, ?) "
+                "ON CONFLICT (guild_id) DO UPDATE SET channel_id = excluded.channel_id",
+                (str(guild_id), channel_id),
+            )
+
+    def get_bot_state(self, key):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT value FROM bot_state WHERE key = ?",
+                (key,),
+            ).fetchone()
+        return json.loads(row["value"]) if row else None
+
+    def set_bot_state(self, key, value):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO bot_state (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                (key, json.dumps(value)),
+            )
+
+    @staticmethod
+    def _lp_history_chunk(row):
+        chunk = {
+            "puuid": row["puuid"],
+            "season": row["season"],
+            "index": row["chunk_index"],
+        }
+        for column in LP_HISTORY_SUMMARY_COLUMNS:
+            chunk[column] = row[column]
+        for column in ("ts_deltas", "score_deltas"):
+            chunk[column] = array(LP_HISTORY_ARRAY_TYPE, row[column]).tolist()
+        return chunk
+
+    def get_lp_history(self, puuid, season):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT * FROM lp_history WHERE puuid = ? AND season = ? "
+                "ORDER BY chunk_index",
+                (puuid, season),
+            ).fetchall()
+        return [self._lp_history_chunk(row) for row in rows]
+
+    def get_latest_lp_history_chunk(self, puuid, season):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT * FROM lp_history WHERE puuid = ? AND season = ? "
+                "ORDER BY chunk_index DESC LIMIT 1",
+                (puuid, season),
+            ).fetchone()
+        return None if row is None else self._lp_history_chunk(row)
+
+    def save_lp_history_chunk(self, chunk):
+        columns = ("puuid", "season", "chunk_index", *LP_HISTORY_SUMMARY_COLUMNS)
+        values = [chunk["puuid"], chunk["season"], chunk["index"]]
+        values += [chunk[column] for column in LP_HISTORY_SUMMARY_COLUMNS]
+        values += [
+            array(LP_HISTORY_ARRAY_TYPE, chunk[column]).tobytes()
+            for column in ("ts_deltas", "score_deltas")
+        ]
+        columns += ("ts_deltas", "score_deltas")
+        with self._lock, self.conn:
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO lp_history ({', '.join(columns)}) "
+                f"VALUES ({', '.join('?' * len(columns))})",
+                values,
+            )
+
+    def get_partition_leases(self):
+        with self._lock:
+            rows = self.conn.execute("SELECT * FROM partition_leases").fetchall()
+        return {
+            row["partition"]: {"owner": row["owner"], "expires_at": row["expires_at"]}
+            for row in rows
+        }
+
+    def try_acquire_partition_lease(self, partition, worker_id, now, expires_at):
+        with self._lock, self.conn:
+            changed = self.conn.execute(
+                "INSERT INTO partition_leases (partition, owner, expires_at) "
+                "VALUES (?, ?, ?) "
+                "ON CONFLICT (partition) DO UPDATE SET owner = excluded.owner, "
+                "expires_at = excluded.expires_at "
+                "WHERE partition_leases.owner = excluded.owner "
+                "OR partition_leases.expires_at <= ?",
+                (partition, worker_id, expires_at, now),
+            ).rowcount
+        return changed > 0
+
+    def release_partition_lease(self, partition, worker_id):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "DELETE FROM partition_leases WHERE partition = ? AND owner = ?",
+                (partition, worker_id),
+            )
+
+    def register_worker(self, worker_id, expires_at):
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT INTO workers (worker_id, expires_at) VALUES (?, ?) "
+                "ON CONFLICT (worker_id) DO UPDATE "
+                "SET expires_at = excluded.expires_at",
+                (worker_id, expires_at),
+            )
+
+    def get_live_workers(self, now):
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT worker_id FROM workers WHERE expires_at > ?",
+                (now,),
+            ).fetchall()
+        return {row["worker_id"] for row in rows}
+
+
+# Startup
+
+
+def firestore_startup():
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
     if not firebase_admin._apps:
         try:
             b64_creds = os.getenv("FIREBASE_CREDENTIALS_BASE64")
@@ -35,3 +730,28 @@ def database_startup():
             logger.exception(f"❌ ERROR: initializing Firebase: {e}")
             return None
     return firestore.client()
+
+
+def database_startup():
+    """Builds the storage backend selected by the DATABASE_BACKEND env variable.
+
+    Supported values are ``firestore`` (default) and ``sqlite``, the latter
+    reading its file location from SQLITE_PATH.
+    """
+    backend = os.getenv("DATABASE_BACKEND", "firestore").lower()
+    if backend == "sqlite":
+        path = os.getenv("SQLITE_PATH", DEFAULT_SQLITE_PATH)
+        try:
+            storage = SQLiteStorage(path)
+        except sqlite3.Error as e:
+            logger.exception(f"❌ ERROR: opening SQLite database {path}: {e}")
+            return None
+        logger.info(f"✅ SQLite database opened at {path}")
+        return storage
+    if backend != "firestore":
+        logger.error(f"❌ ERROR: Unknown DATABASE_BACKEND '{backend}'")
+        return None
+    client = firestore_startup()
+    if client is None:
+        return None
+    return FirestoreStorage(client)
@@ -0,0 +1,113 @@
+import asyncio
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import UTC, datetime
+
+from cache import TTLCache
+
+# Configuration
+
+GRAPH_WORKERS = 2
+GRAPH_CACHE_SIZE = 256
+
+
+# Rendering (runs inside worker processes)
+
+
+def render_lp_graph(title, timestamps, scores, tick_positions, tick_labels):
+    """Draws an LP-over-time step chart and returns it as PNG bytes.
+
+    This is CPU-bound and is meant to run in a worker process, so it only takes
+    plain, picklable arguments and imports matplotlib lazily.
+    """
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.dates as mdates
+    import matplotlib.pyplot as plt
+
+    dates = [datetime.fromtimestamp(ts, UTC) for ts in timestamps]
+    fig, ax = plt.subplots(figsize=(8, 4), dpi=100)
+    try:
+        ax.step(dates, scores, where="post", color="#5865F2", linewidth=2)
+        ax.scatter(dates, scores, color="#5865F2", s=12, zorder=3)
+        ax.set_title(title)
+        ax.set_yticks(tick_positions, tick_labels)
+        ax.grid(axis="y", alpha=0.3)
+        ax.xaxis.set_major_formatter(mdates.DateFormatter("%m-%d"))
+        fig.autofmt_xdate()
+        fig.tight_layout()
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format="png")
+    finally:
+        plt.close(fig)
+    return buffer.getvalue()
+
+
+# Renderer
+
+
+def graph_mp_context():
+    """Returns the start method for render workers.
+
+    Workers must not start a second bot. Forkserver children are forked from a
+    fresh server that only preloads this module, and the bot itself is only
+    imported inside ``main.main``, so re-running the entry script in a worker
+    stays cheap. Spawn is the fallback where forkserver is unavailable.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+class GraphRenderer:
+    """Renders LP graphs in a process pool, caching images per player version.
+
+    A player's ``version`` changes whenever new LP history is recorded, so a
+    cached image stays valid until the next rank change. Concurrent requests for
+    the same image share a single render.
+    """
+
+    def __init__(self, max_workers=GRAPH_WORKERS, cache_size=GRAPH_CACHE_SIZE):
+        self.max_workers = max_workers
+        self.cache = TTLCache(maxsize=cache_size)
+        self._executor = None
+        self._in_flight = {}
+
+    def _get_executor(self):
+        # The pool is created lazily so bots that never graph never pay for it
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=graph_mp_context(),
+            )
+        return self._executor
+
+    async def render(self, key, version, *render_args):
+        cached = self.cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        in_flight_key = (key, version)
+        future = self._in_flight.get(in_flight_key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(
+                self._get_executor(),
+                render_lp_graph,
+                *render_args,
+            )
+            self._in_flight[in_flight_key] = future
+        try:
+            image = await future
+        finally:
+            self._in_flight.pop(in_flight_key, None)
+        self.cache.set(key, (version, image))
+        return image
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,212 @@
+import bisect
+import time
+from datetime import UTC, datetime
+
+from utils import RANK_ORDER, TIER_ORDER
+
+# Configuration
+
+CHUNK_SIZE = 512  # data points per stored chunk
+LP_PER_DIVISION = 100
+LP_PER_TIER = 4 * LP_PER_DIVISION
+APEX_TIERS = ("MASTER", "GRANDMASTER", "CHALLENGER")
+
+# LP history is kept as append-only chunks, one series per player per season.
+# A chunk stores its first timestamp/score plus delta arrays, alongside summary
+# metadata (time span, min/max, first/last score) so range queries only need to
+# decode the chunks that straddle the edges of the requested window.
+
+
+def current_season(now=None):
+    now = time.time() if now is None else now
+    return str(datetime.fromtimestamp(now, UTC).year)
+
+
+def ladder_score(tier, rank, lp):
+    """Maps tier/rank/LP onto a single number that grows with ladder position.
+
+    Returns:
+        None for unranked players, as they have no position on the ladder.
+    """
+    tier = (tier or "").upper()
+    tier_index = TIER_ORDER.get(tier, -1)
+    if tier_index < 0:
+        return None
+    if tier in APEX_TIERS:
+        # Apex tiers have no divisions, their LP just keeps counting up
+        return TIER_ORDER["MASTER"] * LP_PER_TIER + lp
+    division = max(RANK_ORDER.get(rank, 1) - 1, 0)
+    return tier_index * LP_PER_TIER + division * LP_PER_DIVISION + lp
+
+
+def describe_score(score):
+    """Turns a ladder score back into a human readable rank."""
+    master_floor = TIER_ORDER["MASTER"] * LP_PER_TIER
+    if score >= master_floor:
+        return f"MASTER+ {score - master_floor} LP"
+    tiers = {index: name for name, index in TIER_ORDER.items()}
+    divisions = {index: name for name, index in RANK_ORDER.items()}
+    tier_index, remainder = divmod(score, LP_PER_TIER)
+    division, lp = divmod(remainder, LP_PER_DIVISION)
+    return f"{tiers[tier_index]} {divisions[division + 1]} {lp} LP"
+
+
+# Chunk Encoding
+
+
+def new_chunk(puuid, season, index, ts, score):
+    return {
+        "puuid": puuid,
+        "season": season,
+        "index": index,
+        "count": 1,
+        "start_ts": ts,
+        "end_ts": ts,
+        "first_score": score,
+        "last_score": score,
+        "min_score": score,
+        "max_score": score,
+        "ts_deltas": [0],
+        "score_deltas": [0],
+    }
+
+
+def append_point(chunks, puuid, season, ts, score):
+    """Appends a data point to a player's season series.
+
+    Args:
+        chunks: The player's chunks for ``season``, ordered by index. The list is
+            modified in place.
+        puuid: The player's puuid.
+        season: The season the point belongs to.
+        ts: Unix timestamp (seconds) of the observation.
+        score: Ladder score, as returned by ``ladder_score``.
+
+    Returns:
+        The chunk that was created or modified and therefore needs to be saved.
+    """
+    ts = int(ts)
+    if not chunks or chunks[-1]["count"] >= CHUNK_SIZE:
+        index = chunks[-1]["index"] + 1 if chunks else 0
+        chunk = new_chunk(puuid, season, index, ts, score)
+        chunks.append(chunk)
+        return chunk
+    chunk = chunks[-1]
+    chunk["ts_deltas"].append(max(ts - chunk["end_ts"], 0))
+    chunk["score_deltas"].append(score - chunk["last_score"])
+    chunk["count"] += 1
+    chunk["end_ts"] = max(ts, chunk["end_ts"])
+    chunk["last_score"] = score
+    chunk["min_score"] = min(chunk["min_score"], score)
+    chunk["max_score"] = max(chunk["max_score"], score)
+    return chunk
+
+
+def decode_chunk(chunk):
+    """Returns the chunk's (timestamps, scores) as two parallel lists."""
+    timestamps = []
+    scores = []
+    ts = chunk["start_ts"]
+    score = chunk["first_score"]
+    for ts_delta, score_delta in zip(
+        chunk["ts_deltas"],
+        chunk["score_deltas"],
+        strict=True,
+    ):
+        ts += ts_delta
+        score += score_delta
+        timestamps.append(ts)
+        scores.append(score)
+    return timestamps, scores
+
+
+# Range Queries
+
+
+def summarize_history(chunks, since):
+    """Summarizes a season series over the window starting at ``since``.
+
+    Returns:
+        None if the series is empty, otherwise a dict with the ``current`` score,
+        the ``peak`` score inside the window, the ``net`` score change over the
+        window and the number of ``changes`` (moves from one recorded score to
+        the next) inside it.
+    """
+    if not chunks:
+        return None
+    baseline = None
+    peak = None
+    points = 0
+    for chunk in chunks:
+        if chunk["end_ts"] < since:
+            # Entirely before the window, only its last value matters
+            baseline = chunk["last_score"]
+            continue
+        if chunk["start_ts"] >= since:
+            # Entirely inside the window, answered from the chunk metadata
+            in_window_peak = chunk["max_score"]
+            points += chunk["count"]
+            if baseline is None:
+                baseline = chunk["first_score"]
+        else:
+            timestamps, scores = decode_chunk(chunk)
+            split = bisect.bisect_left(timestamps, since)
+            if split:
+                baseline = scores[split - 1]
+            elif baseline is None:
+                baseline = scores[0]
+            in_window_peak = max(scores[split:])
+            points += len(scores) - split
+        peak = in_window_peak if peak is None else max(peak, in_window_peak)
+    current = chunks[-1]["last_score"]
+    # The first point of a series is the baseline written by !track, not a
+    # change, unless an earlier point precedes it
+    earlier_point = chunks[0]["start_ts"] < since
+    changes = points - 1 + earlier_point if points else 0
+    # The player sat at the baseline when the window opened
+    peak = baseline if peak is None else max(peak, baseline)
+    return {
+        "current": current,
+        "peak": peak,
+        "net": current - baseline,
+        "changes": changes,
+    }
+
+
+def series_points(chunks):
+    """Returns the whole season series as (timestamps, scores) parallel lists."""
+    timestamps = []
+    scores = []
+    for chunk in chunks:
+        chunk_timestamps, chunk_scores = decode_chunk(chunk)
+        timestamps.extend(chunk_timestamps)
+        scores.extend(chunk_scores)
+    return timestamps, scores
+
+
+def series_version(chunks):
+    """Returns a value that changes whenever a point is appended to the series."""
+    if not chunks:
+        return None
+    return (chunks[-1]["index"], chunks[-1]["count"], chunks[-1]["end_ts"])
+
+
+def division_ticks(min_score, max_score):
+    """Returns (positions, labels) for the division boundaries around a range."""
+    positions = []
+    labels = []
+    master_floor = TIER_ORDER["MASTER"] * LP_PER_TIER
+    start = (min_score // LP_PER_DIVISION) * LP_PER_DIVISION
+    for position in range(start, max_score + 1, LP_PER_DIVISION):
+        if position > master_floor:
+            break
+        positions.append(position)
+        labels.append(describe_score(position).removesuffix(" 0 LP"))
+    if max_score > master_floor:
+        # Apex tiers have no divisions, label the LP itself
+        if not positions:
+            positions.append(min_score)
+            labels.append(describe_score(min_score))
+        positions.append(max_score)
+        labels.append(describe_score(max_score))
+    return positions, labels
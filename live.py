@@ -0,0 +1,108 @@
+import random
+
+# Configuration
+
+RANKED_SOLO_QUEUE_ID = 420
+# Players seen in game or changing rank within this window are polled often
+HOT_WINDOW_SECONDS = 6 * 60 * 60
+HOT_POLL_SECONDS = 3 * 60
+COLD_POLL_SECONDS = 20 * 60
+IN_GAME_POLL_SECONDS = 2 * 60
+# Riot usually settles LP a minute or two after the game ends
+POST_GAME_DELAY_SECONDS = 60
+POST_GAME_TIMEOUT_SECONDS = 15 * 60
+
+
+class LiveGameTracker:
+    """Schedules spectator polls and remembers which players are in game.
+
+    Players who were recently active are polled every few minutes, everyone else
+    only a few times an hour, so the spectator budget goes to players who are
+    likely to be playing. When a game ends the player is queued for a post-game
+    rank check instead of waiting for the next background sweep.
+    """
+
+    def __init__(self):
+        self.last_active = {}  # puuid -> last time seen in game or changing rank
+        self.next_check = {}  # puuid -> when the spectator should be polled next
+        self.in_game = {}  # puuid -> gameId of the ranked game they are in
+        self.finished = {}  # riot_id -> when their game was seen ending
+
+    def mark_active(self, puuid, now):
+        self.last_active[puuid] = now
+        # Pull the next poll forward if the player was on the cold schedule
+        self.next_check[puuid] = min(
+            self.next_check.get(puuid, now),
+            now + HOT_POLL_SECONDS,
+        )
+
+    def due_players(self, users, now):
+        """Returns the tracked users whose spectator poll is due."""
+        return [u for u in users if self.next_check.get(u.get("puuid"), 0) <= now]
+
+    def _schedule(self, puuid, now):
+        if puuid in self.in_game:
+            interval = IN_GAME_POLL_SECONDS
+        elif now - self.last_active.get(puuid, float("-inf")) < HOT_WINDOW_SECONDS:
+            interval = HOT_POLL_SECONDS
+        else:
+            # Jitter spreads cold players out instead of polling them in bursts
+            interval = COLD_POLL_SECONDS * random.uniform(0.75, 1.25)
+        self.next_check[puuid] = now + interval
+
+    def record_check(self, user, game, now):
+        """Updates a player's state from a spectator response.
+
+        Returns:
+            "started" the first time a ranked game is seen, "ended" once that game
+            is gone, None otherwise.
+        """
+        puuid = user.get("puuid")
+        game_id = None
+        if game and game.get("gameQueueConfigId") == RANKED_SOLO_QUEUE_ID:
+            game_id = game.get("gameId")
+        previous_game_id = self.in_game.get(puuid)
+        event = None
+        if game_id is not None:
+            self.in_game[puuid] = game_id
+            self.last_active[puuid] = now
+            if game_id != previous_game_id:
+                event = "started"
+        elif previous_game_id is not None:
+            del self.in_game[puuid]
+            self.finished[user.get("riot_id")] = now
+            event = "ended"
+        self._schedule(puuid, now)
+        return event
+
+    def post_game_due(self, now):
+        """Returns the riot_ids whose post-game rank check should run now.
+
+        Players that waited past the timeout are dropped, the background sweep
+        will pick them up as usual.
+        """
+        due = []
+        for riot_id, ended_at in list(self.finished.items()):
+            if now - ended_at >= POST_GAME_TIMEOUT_SECONDS:
+                del self.finished[riot_id]
+            elif now - ended_at >= POST_GAME_DELAY_SECONDS:
+                due.append(riot_id)
+        return due
+
+    def resolve_finished(self, riot_id):
+        self.finished.pop(riot_id, None)
+
+    def snapshot(self):
+        return {
+            "last_active": self.last_active,
+            "next_check": self.next_check,
+            "in_game": self.in_game,
+            "finished": self.finished,
+        }
+
+    def restore(self, state):
+        """Picks up the schedule and in-game state saved by ``snapshot``."""
+        self.last_active.update(state.get("last_active", {}))
+        self.next_check.update(state.get("next_check", {}))
+        self.in_game.update(state.get("in_game", {}))
+        self.finished.update(state.get("finished", {}))
@@ -1,20 +1,172 @@
+import atexit
+import contextvars
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+import threading
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+# Logging is configured on import, before the bot loads its own settings
+load_dotenv()
+
+# Configuration
+
+# LOG_FORMAT=json emits one JSON object per line instead of the text format
+LOG_FORMAT_ENV = "LOG_FORMAT"
+# Each WARNING-or-lower call site logs at most LOG_SAMPLE_LIMIT records per
+# LOG_SAMPLE_WINDOW seconds, the rest are counted and reported once it reopens
+LOG_SAMPLE_LIMIT = int(os.getenv("LOG_SAMPLE_LIMIT", "20"))
+LOG_SAMPLE_WINDOW = 60
+
+TEXT_FORMAT = (
+    "%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - "
+    "%(correlation)s%(message)s"
+)
+DATE_FORMAT = "%m-%d-%Y %H:%M:%S"
+
+# Correlation ID of the unit of work (e.g. one background sweep) being logged
+correlation_id = contextvars.ContextVar("correlation_id", default=None)
+
+
+def new_correlation_id(prefix):
+    """Tags every record logged from the current task with a fresh ID."""
+    value = f"{prefix}-{uuid.uuid4().hex[:8]}"
+    correlation_id.set(value)
+    return value
+
+
+# Filters
+
+
+class CorrelationFilter(logging.Filter):
+    """Stamps records with the caller's correlation ID.
+
+    Runs on the queue handler, i.e. still in the caller's task or thread, where
+    the context variable is visible.
+    """
+
+    def filter(self, record):
+        record.correlation_id = correlation_id.get()
+        record.correlation = (
+            f"[{record.correlation_id}] " if record.correlation_id else ""
+        )
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Rate limits repetitive records per call site.
+
+    Errors always go through. Other records from the same file and line are
+    capped at ``limit`` per ``window`` seconds, and the first record after a
+    window with drops notes how many were suppressed.
+    """
+
+    def __init__(self, limit=LOG_SAMPLE_LIMIT, window=LOG_SAMPLE_WINDOW):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self._sites = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.ERROR or self.limit <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            window_start, count, suppressed = self._sites.get(key, (now, 0, 0))
+            if now - window_start >= self.window:
+                window_start, count = now, 0
+            if count >= self.limit:
+                self._sites[key] = (window_start, count, suppressed + 1)
+                return False
+            self._sites[key] = (window_start, count + 1, 0)
+        if suppressed:
+            record.msg = f"{record.msg} ({suppressed} similar messages suppressed)"
+        return True
+
+
+# Handlers
+
+
+class RecordQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that keeps records structured for the listener.
+
+    The stock handler flattens the traceback into the message, this one
+    renders the message and traceback separately so formatters can place them.
+    """
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
+# Formatters
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "location": f"{record.filename}:{record.lineno}",
+            "message": record.getMessage(),
+        }
+        if getattr(record, "correlation_id", None):
+            entry["correlation_id"] = record.correlation_id
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        # Records from loggers that bypass the queue handler lack the field
+        if not hasattr(record, "correlation"):
+            record.correlation = ""
+        return super().format(record)
+
+
+# Setup
 
 
 def setup_logging():
+    """Routes all logging through a queue so formatting and I/O leave the caller.
+
+    Callers (mostly the event loop) only enqueue records. A listener thread
+    formats them and writes them to stdout.
+    """
     logger = logging.getLogger()
     if logger.hasHandlers():
         logger.handlers.clear()
     logger.setLevel(logging.INFO)  # Capture everything INFO and above (WARNING, ERROR)
     c_handler = logging.StreamHandler(sys.stdout)
-    c_format = logging.Formatter(
-        "%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s",
-        datefmt="%m-%d-%Y %H:%M:%S",
-    )
-    c_handler.setFormatter(c_format)
-    if not logger.handlers:
-        logger.addHandler(c_handler)
+    if os.getenv(LOG_FORMAT_ENV, "text").lower() == "json":
+        c_handler.setFormatter(JSONFormatter())
+    else:
+        c_handler.setFormatter(TextFormatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
+    log_queue = queue.SimpleQueue()
+    q_handler = RecordQueueHandler(log_queue)
+    q_handler.addFilter(SamplingFilter())
+    q_handler.addFilter(CorrelationFilter())
+    listener = logging.handlers.QueueListener(log_queue, c_handler)
+    listener.start()
+    atexit.register(listener.stop)
+    logger.addHandler(q_handler)
     return logger
 
 
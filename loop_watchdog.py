@@ -0,0 +1,162 @@
+import asyncio
+import os
+import sys
+import sysconfig
+import threading
+import time
+import traceback
+
+import sentry_sdk
+
+from logger_config import logger
+
+# Configuration
+
+# Event loop stalls longer than this are reported, 0 disables the watchdog
+LOOP_LAG_THRESHOLD_SECONDS = float(os.getenv("LOOP_LAG_THRESHOLD_SECONDS", "0.5"))
+LOOP_LAG_CHECK_SECONDS = 0.1
+THIS_FILE = os.path.abspath(__file__)
+PROJECT_DIR = os.path.dirname(THIS_FILE) + os.sep
+# Interpreter and installed package trees, which may live inside the project
+# (e.g. a .venv), aren't our code. A prefix that contains the project itself
+# is skipped, or every frame would be excluded.
+LIBRARY_DIRS = tuple(
+    {
+        os.path.abspath(path) + os.sep
+        for path in (
+            sys.prefix,
+            sys.base_prefix,
+            sysconfig.get_path("stdlib"),
+            sysconfig.get_path("purelib"),
+            sysconfig.get_path("platlib"),
+        )
+        if path and not PROJECT_DIR.startswith(os.path.abspath(path) + os.sep)
+    },
+)
+PACKAGE_DIR_NAMES = ("site-packages", "dist-packages")
+
+
+def is_project_file(filename):
+    filename = os.path.abspath(filename)
+    if not filename.startswith(PROJECT_DIR) or filename == THIS_FILE:
+        return False
+    if filename.startswith(LIBRARY_DIRS):
+        return False
+    parts = filename[len(PROJECT_DIR) :].split(os.sep)
+    return not any(name in parts for name in PACKAGE_DIR_NAMES)
+
+
+def blocking_frame(frame):
+    """Returns the innermost frame from our own code, or the innermost frame."""
+    innermost = frame
+    while frame is not None:
+        if is_project_file(frame.f_code.co_filename):
+            return frame
+        frame = frame.f_back
+    return innermost
+
+
+class LoopWatchdog:
+    """Detects event loop stalls and reports what was blocking the loop.
+
+    A heartbeat task on the loop records when it last got to run. A daemon
+    thread checks the heartbeat, and when it is older than ``threshold`` it
+    grabs the loop thread's stack and reports the blocking frame through the
+    logger and Sentry, once per stall.
+    """
+
+    def __init__(
+        self,
+        threshold=LOOP_LAG_THRESHOLD_SECONDS,
+        interval=LOOP_LAG_CHECK_SECONDS,
+    ):
+        self.threshold = threshold
+        self.interval = interval
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.stalls = 0
+        self._last_beat = None
+        self._reported_beat = None
+        self._loop_thread_id = None
+        self._heartbeat = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        """Starts watching the running loop, must be called from the loop."""
+        if self.threshold <= 0 or self._thread is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stop.clear()
+        self._heartbeat = asyncio.get_running_loop().create_task(self._beat())
+        self._thread = threading.Thread(
+            target=self._watch,
+            name="loop-watchdog",
+            daemon=True,
+        )
+        self._thread.start()
+        logger.info(f"✅ Event loop watchdog started ({self.threshold}s threshold).")
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._heartbeat.cancel()
+        self._thread.join(timeout=1)
+        self._thread = None
+
+    async def _beat(self):
+        while True:
+            start = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.lag = max(now - start - self.interval, 0.0)
+            self.max_lag = max(self.max_lag, self.lag)
+            self._last_beat = now
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            self.check(time.monotonic())
+
+    def check(self, now):
+        """Reports the current stall, if any, returning True when it reported."""
+        beat = self._last_beat
+        if self._reported_beat is not None and beat != self._reported_beat:
+            logger.info(
+                f"✅ Event loop recovered after a {beat - self._reported_beat:.2f}s "
+                "stall",
+            )
+            self._reported_beat = None
+        stalled = now - beat
+        if stalled < self.threshold or self._reported_beat == beat:
+            return False
+        self._reported_beat = beat
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return False
+        self.stalls += 1
+        self.report(stalled, frame)
+        return True
+
+    def report(self, stalled, frame):
+        culprit = blocking_frame(frame)
+        location = (
+            f"{os.path.basename(culprit.f_code.co_filename)}:{culprit.f_lineno} "
+            f"in {culprit.f_code.co_name}"
+        )
+        stack = "".join(traceback.format_stack(frame))
+        logger.warning(
+            f"⚠️ Event loop blocked for {stalled:.2f}s at {location}\n{stack}",
+        )
+        with sentry_sdk.new_scope() as scope:
+            # Group stalls by the blocking call site rather than the message
+            scope.fingerprint = ["event-loop-stall", location]
+            scope.set_context(
+                "event_loop_stall",
+                {"stalled_seconds": round(stalled, 3), "stack": stack},
+            )
+            sentry_sdk.capture_message(
+                f"Event loop blocked at {location}",
+                level="warning",
+            )
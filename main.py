@@ -1,7 +1,8 @@
-from bot import bot_startup
-
-
 def main():
+    # Imported here so multiprocessing workers, which re-run this script as
+    # __mp_main__, don't build a second bot
+    from bot import bot_startup
+
     bot_startup()
 
 
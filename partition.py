@@ -0,0 +1,107 @@
+import hashlib
+import math
+
+from logger_config import logger
+
+# Configuration
+
+LEASE_SECONDS = 90
+LEASE_RENEW_SECONDS = 30  # must stay well below LEASE_SECONDS
+
+
+def partition_for(puuid, partitions):
+    """Maps a puuid onto a polling partition with a hash that is stable across runs."""
+    digest = hashlib.blake2b(puuid.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % partitions
+
+
+def parse_shard_ids(value):
+    """Parses a SHARD_IDS setting such as "0,1,4" or "0-3" into a list of ints."""
+    if not value:
+        return None
+    shard_ids = []
+    for part in value.split(","):
+        part = part.strip()
+        if "-" in part:
+            start, end = part.split("-", 1)
+            shard_ids.extend(range(int(start), int(end) + 1))
+        elif part:
+            shard_ids.append(int(part))
+    return shard_ids
+
+
+class PartitionLeaser:
+    """Splits tracked users between bot processes through leases in the database.
+
+    Users are hashed by puuid into a fixed number of partitions. Every worker
+    periodically calls ``rebalance``, which heartbeats the worker, renews the
+    leases it holds and takes free or expired ones until it owns its fair share
+    of partitions among the live workers. When a worker dies its leases expire
+    and the survivors pick its partitions up, and when a worker joins the others
+    shed partitions down to the new fair share.
+    """
+
+    def __init__(self, storage, worker_id, partitions, lease_seconds=LEASE_SECONDS):
+        self.storage = storage
+        self.worker_id = worker_id
+        self.partitions = partitions
+        self.lease_seconds = lease_seconds
+        self.owned = set()
+
+    def owns(self, puuid):
+        return partition_for(puuid, self.partitions) in self.owned
+
+    def rebalance(self, now):
+        expires_at = now + self.lease_seconds
+        self.storage.register_worker(self.worker_id, expires_at)
+        workers = self.storage.get_live_workers(now) | {self.worker_id}
+        leases = self.storage.get_partition_leases()
+        live = {
+            partition: lease
+            for partition, lease in leases.items()
+            if lease["expires_at"] > now
+        }
+        fair_share = math.ceil(self.partitions / len(workers))
+        mine = sorted(
+            partition
+            for partition, lease in live.items()
+            if lease["owner"] == self.worker_id
+        )
+        # Shed partitions above the fair share so new workers can take them
+        for partition in mine[fair_share:]:
+            self.storage.release_partition_lease(partition, self.worker_id)
+        owned = set()
+        for partition in mine[:fair_share]:
+            if self.storage.try_acquire_partition_lease(
+                partition,
+                self.worker_id,
+                now,
+                expires_at,
+            ):
+                owned.add(partition)
+        for partition in range(self.partitions):
+            if len(owned) >= fair_share:
+                break
+            if partition in live:
+                continue
+            if self.storage.try_acquire_partition_lease(
+                partition,
+                self.worker_id,
+                now,
+                expires_at,
+            ):
+                owned.add(partition)
+        if owned != self.owned:
+            logger.info(
+                f"♻️ Worker {self.worker_id} now owns {len(owned)}/{self.partitions} "
+                f"partitions ({len(workers)} workers)",
+            )
+        self.owned = owned
+        return owned
+
+    def release_all(self, now):
+        """Gives up every lease so other workers can take over immediately."""
+        for partition in self.owned:
+            self.storage.release_partition_lease(partition, self.worker_id)
+        self.storage.register_worker(self.worker_id, now)
+        self.owned = set()
@@ -0,0 +1,179 @@
+import os
+import sys
+import threading
+from collections import Counter
+from datetime import UTC, datetime
+
+from logger_config import logger
+
+# Configuration
+
+PROFILE_SAMPLE_SECONDS = 0.005
+DEFAULT_PROFILE_DIR = "profiles"
+PROFILE_TARGETS = ("sweep", "commands")
+
+
+def frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_qualname}"
+
+
+def is_idle(frame):
+    """Whether the thread is parked in the event loop waiting for I/O."""
+    return frame.f_code.co_name == "select" and frame.f_code.co_filename.endswith(
+        "selectors.py",
+    )
+
+
+class SamplingProfiler:
+    """Samples one thread's stack on a timer and aggregates the folded stacks.
+
+    Samples are only taken while ``active`` is set, and samples where the event
+    loop sits idle waiting for I/O are counted apart, so the profile shows
+    where the loop actually spends its time. The folded output (one
+    ``outer;...;inner count`` line per stack) can be fed to flamegraph.pl or
+    speedscope directly.
+    """
+
+    def __init__(self, thread_id, interval=PROFILE_SAMPLE_SECONDS):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.active = False
+        self.stacks = Counter()
+        self.idle = 0
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._run,
+            name="sampling-profiler",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            if not self.active:
+                continue
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.record(frame)
+
+    def record(self, frame):
+        if is_idle(frame):
+            self.idle += 1
+            return
+        names = []
+        while frame is not None:
+            names.append(frame_name(frame))
+            frame = frame.f_back
+        self.stacks[";".join(reversed(names))] += 1
+
+    @property
+    def samples(self):
+        return sum(self.stacks.values())
+
+    def folded(self):
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.items())
+
+    def top_functions(self, limit=10):
+        """Returns the (function, samples) pairs with the most cumulative samples."""
+        cumulative = Counter()
+        for stack, count in self.stacks.items():
+            # Recursive functions only count once per sample
+            for name in set(stack.split(";")):
+                cumulative[name] += count
+        return cumulative.most_common(limit)
+
+    def summary(self, limit=10):
+        busy = self.samples
+        lines = [
+            f"{busy} busy samples, {self.idle} idle "
+            f"(every {self.interval * 1000:.0f} ms)",
+        ]
+        for name, count in self.top_functions(limit):
+            lines.append(
+                f"{count * self.interval:8.2f}s {count / busy:6.1%}  {name}",
+            )
+        return "\n".join(lines)
+
+    def save(self, directory, label):
+        """Writes the folded stacks to ``directory`` and returns the file path."""
+        os.makedirs(directory, exist_ok=True)
+        stamp = datetime.now(UTC).strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(directory, f"{label}-{stamp}.folded")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.folded())
+        return path
+
+
+class ProfileCapture:
+    """Arms the sampling profiler for the next N sweeps or command invocations.
+
+    While disarmed, ``begin`` and ``end`` are a single comparison and no
+    sampling thread exists, so leaving the hooks in place costs nothing.
+    """
+
+    def __init__(self):
+        self.target = None
+        self.remaining = 0
+        self.running = 0
+        self.channel = None
+        self.profiler = None
+
+    def arm(self, target, runs, thread_id, channel=None):
+        """Starts capturing the next ``runs`` runs of ``target``.
+
+        Args:
+            target: One of ``PROFILE_TARGETS``.
+            runs: How many sweeps or command invocations to capture.
+            thread_id: The event loop thread to sample.
+            channel: Where to post the summary, if anywhere.
+
+        Returns:
+            False if a capture is already in progress.
+        """
+        if self.target is not None:
+            return False
+        self.target = target
+        self.remaining = runs
+        self.running = 0
+        self.channel = channel
+        self.profiler = SamplingProfiler(thread_id)
+        self.profiler.start()
+        logger.info(f"🔬 Profiling the next {runs} {target} run(s)")
+        return True
+
+    def begin(self, target):
+        if self.target != target:
+            return
+        self.running += 1
+        self.profiler.active = True
+
+    def end(self, target):
+        """Marks a run finished.
+
+        Returns:
+            None until the last run ends, then the (target, profiler, channel)
+            of the finished capture.
+        """
+        if self.target != target or self.running == 0:
+            return None
+        self.running -= 1
+        self.remaining -= 1
+        if self.running == 0:
+            self.profiler.active = False
+        if self.remaining > 0:
+            return None
+        capture = (self.target, self.profiler, self.channel)
+        self.profiler.stop()
+        self.target = None
+        self.profiler = None
+        self.channel = None
+        return capture
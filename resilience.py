@@ -0,0 +1,116 @@
+import asyncio
+import random
+import time
+
+from logger_config import logger
+
+# Configuration
+
+BACKOFF_BASE_SECONDS = 0.5
+BACKOFF_MAX_SECONDS = 8
+BREAKER_FAILURE_THRESHOLD = 5  # consecutive failures before a host is paused
+BREAKER_RESET_SECONDS = 30
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE_SECONDS, cap=BACKOFF_MAX_SECONDS):
+    """Returns a "full jitter" exponential backoff delay for a retry attempt.
+
+    The delay is drawn uniformly up to ``base * 2**attempt`` (capped), so many
+    callers failing at once don't all retry in lockstep.
+    """
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class CircuitBreaker:
+    """Stops calling a host that keeps failing until it has had time to recover.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    ``allow`` refuses calls. Once ``reset_seconds`` have passed a single probe
+    call is let through: a success closes the breaker again, a failure keeps it
+    open for another ``reset_seconds``.
+    """
+
+    def __init__(
+        self,
+        name,
+        failure_threshold=BREAKER_FAILURE_THRESHOLD,
+        reset_seconds=BREAKER_RESET_SECONDS,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self, now=None):
+        if self.opened_at is None:
+            return True
+        now = time.time() if now is None else now
+        if now - self.opened_at < self.reset_seconds:
+            return False
+        # Let one probe through and hold everyone else back for another window
+        self.opened_at = now
+        return True
+
+    def retry_in(self, now=None):
+        """Returns how many seconds remain until the next probe is allowed."""
+        if self.opened_at is None:
+            return 0
+        now = time.time() if now is None else now
+        return max(self.opened_at + self.reset_seconds - now, 0)
+
+    def record_success(self):
+        if self.opened_at is not None:
+            logger.info(f"✅ Circuit closed for {self.name}, calls resumed")
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self, now=None):
+        now = time.time() if now is None else now
+        self.failures += 1
+        if self.opened_at is not None:
+            # A failed probe keeps the host paused for another window
+            self.opened_at = now
+        elif self.failures >= self.failure_threshold:
+            logger.warning(
+                f"⚠️ Circuit opened for {self.name} after {self.failures} failures, "
+                f"pausing calls for {self.reset_seconds} seconds",
+            )
+            self.opened_at = now
+
+
+async def hedged(make_call, hedge_after):
+    """Awaits ``make_call()``, starting a second copy if the first is slow.
+
+    If the first call hasn't finished after ``hedge_after`` seconds a duplicate
+    is started and whichever succeeds first wins, the other is cancelled. If
+    both fail, the first failure is raised.
+
+    Args:
+        make_call: Zero-argument function returning a new awaitable per call.
+        hedge_after: Seconds to wait before hedging, None disables hedging.
+    """
+    if hedge_after is None:
+        return await make_call()
+    tasks = [asyncio.ensure_future(make_call())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+        if not done:
+            tasks.append(asyncio.ensure_future(make_call()))
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(
+                pending,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+        raise tasks[0].exception()
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,59 @@
+import orjson
+
+# Riot DTOs carry far more than the bot reads (a match-v5 DTO is hundreds of KB
+# of perks, challenges and pings). Responses are decoded with orjson and
+# immediately projected onto the schemas below, so only the fields the bot
+# consumes stay alive.
+#
+# A schema maps a key to None (keep the value as-is) or to a nested schema.
+# Nested schemas apply to every element when the value is a list.
+
+
+def json_loads(data):
+    return orjson.loads(data)
+
+
+def fields(*names):
+    return dict.fromkeys(names)
+
+
+def project(value, schema):
+    """Returns ``value`` reduced to the keys named by ``schema``."""
+    if schema is None or value is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, schema) for item in value]
+    if not isinstance(value, dict):
+        return value
+    return {
+        key: project(value[key], sub_schema)
+        for key, sub_schema in schema.items()
+        if key in value
+    }
+
+
+# Endpoint Schemas
+
+MATCH_SCHEMA = {
+    "metadata": fields("matchId"),
+    "info": {
+        **fields("gameCreation", "gameDuration", "queueId"),
+        "participants": fields(
+            "puuid",
+            "riotIdGameName",
+            "riotIdTagline",
+            "championName",
+            "teamPosition",
+            "teamId",
+            "kills",
+            "deaths",
+            "assists",
+            "win",
+        ),
+    },
+}
+
+ACTIVE_GAME_SCHEMA = {
+    **fields("gameId", "gameQueueConfigId"),
+    "participants": fields("puuid", "riotId", "championId", "teamId"),
+}
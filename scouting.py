@@ -0,0 +1,81 @@
+import numpy as np
+
+# Configuration
+
+ROLE_NAMES = {
+    "TOP": "Top",
+    "JUNGLE": "Jungle",
+    "MIDDLE": "Mid",
+    "BOTTOM": "ADC",
+    "UTILITY": "Support",
+}
+UNKNOWN_ROLE = "Unknown"
+
+
+# Aggregation
+
+
+def kda_ratio(kills, deaths, assists):
+    return (kills + assists) / np.maximum(deaths, 1)
+
+
+def aggregate_scouting(columns):
+    """Aggregates a player's matches into a scouting report.
+
+    Args:
+        columns: Dict of equal-length NumPy columns ``champion``, ``role``,
+            ``kills``, ``deaths``, ``assists`` and ``win`` for the player's games,
+            such as ``MatchWarehouse.player_columns`` returns.
+
+    Returns:
+        None when there are no games, otherwise a dict with the overall
+        ``games``/``win_rate``/``kda``, a ``champions`` list (most played first)
+        and a ``roles`` list of (role, share) pairs.
+    """
+    games = len(columns["win"])
+    if games == 0:
+        return None
+    wins = columns["win"].astype(np.int32)
+    champions, champion_index, champion_games = np.unique(
+        columns["champion"],
+        return_inverse=True,
+        return_counts=True,
+    )
+    n_champions = len(champions)
+    champion_wins = np.bincount(champion_index, weights=wins, minlength=n_champions)
+    champion_kills, champion_deaths, champion_assists = (
+        np.bincount(champion_index, weights=columns[stat], minlength=n_champions)
+        for stat in ("kills", "deaths", "assists")
+    )
+    champion_kda = kda_ratio(champion_kills, champion_deaths, champion_assists)
+    # Most played first, ties broken by win rate
+    order = np.lexsort((-champion_wins / champion_games, -champion_games))
+    roles, role_games = np.unique(columns["role"], return_counts=True)
+    role_order = np.argsort(-role_games, kind="stable")
+    return {
+        "games": games,
+        "win_rate": float(wins.mean()),
+        "kda": float(
+            kda_ratio(
+                columns["kills"].sum(),
+                columns["deaths"].sum(),
+                columns["assists"].sum(),
+            ),
+        ),
+        "champions": [
+            {
+                "champion": str(champions[i]),
+                "games": int(champion_games[i]),
+                "win_rate": float(champion_wins[i] / champion_games[i]),
+                "kda": float(champion_kda[i]),
+            }
+            for i in order
+        ],
+        "roles": [
+            (
+                ROLE_NAMES.get(str(roles[i]), UNKNOWN_ROLE),
+                float(role_games[i] / games),
+            )
+            for i in role_order
+        ],
+    }
@@ -0,0 +1,62 @@
+import json
+import os
+import time
+
+from logger_config import logger
+
+# Configuration
+
+DEFAULT_SNAPSHOT_PATH = "warm_state.json"
+SNAPSHOT_VERSION = 1
+# Older snapshots are ignored, their caches and schedules are too stale to trust
+SNAPSHOT_MAX_AGE_SECONDS = 6 * 60 * 60
+
+# The warm-state snapshot lets a restarted process pick up where the previous
+# one stopped: caches, the live game schedule and when the last sweep ran. It
+# is plain JSON, so tuple cache keys come back as lists and are converted by
+# ``decode_entries``.
+
+
+def save_snapshot(path, state, now=None):
+    """Atomically writes ``state`` to ``path``."""
+    now = time.time() if now is None else now
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({"version": SNAPSHOT_VERSION, "saved_at": now, **state}, f)
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path, now=None, max_age=SNAPSHOT_MAX_AGE_SECONDS):
+    """Reads a snapshot written by ``save_snapshot``.
+
+    Returns:
+        The saved state, or None when there is no usable snapshot (missing,
+        unreadable, from another version or older than ``max_age``).
+    """
+    now = time.time() if now is None else now
+    try:
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️ Ignoring unreadable warm-state snapshot {path}: {e}")
+        return None
+    if state.get("version") != SNAPSHOT_VERSION:
+        return None
+    age = now - state.get("saved_at", 0)
+    if age > max_age:
+        logger.info(f"♻️ Ignoring warm-state snapshot from {age / 3600:.1f}h ago")
+        return None
+    return state
+
+
+def decode_entries(entries):
+    """Turns cache entries read back from JSON into ``TTLCache.restore`` input."""
+    return [
+        (tuple(key) if isinstance(key, list) else key, value, expires_at)
+        for key, value, expires_at in entries
+    ]
@@ -1,15 +1,28 @@
-import sys
+import asyncio
+import json
+import time
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from discord.ext import commands
 
-# Prevents our tests from trying to start the real database when we import from bot.py
-mock_database = MagicMock()
-mock_database.database_startup.return_value = MagicMock()
-mock_database.TRACKED_USERS_COLLECTION = "tracked_users"
-sys.modules["database"] = mock_database
-from bot import track  # noqa: E402
+from bot import (
+    bot,
+    is_recently_polled,
+    lobby,
+    order_users_for_sweep,
+    record_lp_history,
+    scout,
+    split_count_argument,
+    split_riot_id_list,
+    track,
+    trackmany,
+    truncate_lines,
+    update,
+)
+from test_warehouse import make_match
+from utils import UserNotFoundError
+from warehouse import MatchWarehouse
 
 
 @pytest.fixture
@@ -25,11 +38,6 @@ def mock_ctx():
 @pytest.fixture
 def mock_db():
     with patch("bot.db") as mock_db_instance:
-        collection_mock = MagicMock()
-        document_mock = MagicMock()
-        mock_db_instance.collection.return_value = collection_mock
-        mock_db_instance.document.return_value = document_mock
-        document_mock.set = MagicMock()
         yield mock_db_instance
 
 @pytest.mark.asyncio
@@ -43,14 +51,282 @@ async def test_track_success(mock_ctx, mock_db):
         ) as fake_get_ranked_info:
             fake_get_ranked_info.return_value = {"tier": "paper", "rank": "1", "LP": 10}
             await track(mock_ctx, riot_id=fake_riot_id)
-            doc_mock = mock_db.collection.return_value.document.return_value
-            doc_mock.set.assert_called_once()
-            args, kwargs = doc_mock.set.call_args
-            saved_data = args[0]
-            assert saved_data["puuid"] == 12345
-            assert saved_data["tier"] == "paper"
-            assert saved_data["rank"] == "1"
-            assert saved_data["LP"] == 10
-            assert saved_data["server_info.123456789"]["added_by"] == 1
-            assert kwargs.get("merge")
+            mock_db.track_user.assert_called_once_with(
+                "bob#boom",
+                12345,
+                {"tier": "paper", "rank": "1", "LP": 10},
+                123456789,
+                1,
+            )
             mock_ctx.send.assert_called_with("bob#boom is now being tracked!")
+
+
+def test_order_users_for_sweep_resumes_after_cursor():
+    users = [{"riot_id": r} for r in ["c#1", "a#1", "d#1", "b#1"]]
+    ordered = order_users_for_sweep(users, "b#1")
+    assert [u["riot_id"] for u in ordered] == ["c#1", "d#1", "a#1", "b#1"]
+    ordered = order_users_for_sweep(users, None)
+    assert [u["riot_id"] for u in ordered] == ["a#1", "b#1", "c#1", "d#1"]
+
+
+def test_is_recently_polled():
+    assert not is_recently_polled({"last_polled": None}, 1000)
+    assert is_recently_polled({"last_polled": 900}, 1000, min_interval=300)
+    assert not is_recently_polled({"last_polled": 600}, 1000, min_interval=300)
+
+
+def test_split_count_argument():
+    assert split_count_argument("Some Name#tag 20", 10, 30) == ("Some Name#tag", 20)
+    assert split_count_argument("Some Name#tag 99", 10, 30) == ("Some Name#tag", 30)
+    assert split_count_argument("Some Name#tag", 10, 30) == ("Some Name#tag", 10)
+
+
+@pytest.mark.asyncio
+async def test_lobby_single_embed(mock_ctx, mock_db):
+    mock_db.get_tracked_user.return_value = None
+    bot.champion_names = {103: "Ahri"}
+    bot.puuid_cache.clear()
+
+    async def fake_get_puuid(_session, username, _tagline, _key):
+        if username == "ghost":
+            raise UserNotFoundError("not found")
+        return f"puuid-{username}"
+
+    with (
+        patch("bot.get_puuid", side_effect=fake_get_puuid),
+        patch(
+            "bot.get_ranked_info",
+            new_callable=AsyncMock,
+            return_value={"tier": "GOLD", "rank": "II", "LP": 42},
+        ),
+        patch("bot.get_top_mastery", new_callable=AsyncMock, return_value=[103]),
+    ):
+        await lobby(mock_ctx, riot_ids="bob#boom, ghost#tag, nohashtag")
+    mock_ctx.send.assert_called_once()
+    embed = mock_ctx.send.call_args.kwargs["embed"]
+    fields = {field.name: field.value for field in embed.fields}
+    assert fields["bob#boom"] == "GOLD II (42 LP)\nMains: Ahri"
+    assert fields["ghost#tag"] == "Player not found"
+    assert "nohashtag" in embed.footer.text
+    assert bot.puuid_cache.get("bob#boom") == "puuid-bob"
+
+
+def test_split_riot_id_list():
+    text = "bob#boom, amy#tag\nSome Name#NA1,bob#boom\n\n"
+    assert split_riot_id_list(text) == ["bob#boom", "amy#tag", "Some Name#NA1"]
+
+
+def test_truncate_lines():
+    lines = ["a" * 10] * 5
+    assert truncate_lines(lines, 100) == "\n".join(lines)
+    assert truncate_lines(lines, 45) == "\n".join(lines[:2]) + "\n...and 3 more"
+
+
+@pytest.mark.asyncio
+async def test_trackmany_batches_writes(mock_ctx, mock_db):
+    mock_db.get_tracked_user.return_value = None
+    bot.puuid_cache.clear()
+    mock_ctx.message = MagicMock(attachments=[])
+
+    async def fake_get_puuid(_session, username, _tagline, _key):
+        if username == "ghost":
+            raise UserNotFoundError("not found")
+        return f"puuid-{username}"
+
+    ranked_data = {"tier": "GOLD", "rank": "II", "LP": 42}
+    with (
+        patch("bot.get_puuid", side_effect=fake_get_puuid),
+        patch(
+            "bot.get_ranked_info",
+            new_callable=AsyncMock,
+            return_value=ranked_data,
+        ),
+        patch("bot.record_lp_history"),
+    ):
+        await trackmany(mock_ctx, riot_ids="bob#boom, ghost#tag, nohashtag")
+    mock_db.track_users.assert_called_once_with(
+        [("bob#boom", "puuid-bob", ranked_data)],
+        123456789,
+        1,
+    )
+    summary = mock_ctx.send.call_args.args[0]
+    assert summary.startswith("Tracked 1/3 users.")
+    assert "❌ ghost#tag - user not found" in summary
+    assert "❌ nohashtag - invalid riotid" in summary
+
+
+@pytest.mark.asyncio
+async def test_update_reuses_fresh_users(mock_ctx, mock_db):
+    now = time.time()
+    mock_db.get_guild_tracked_users.return_value = [
+        {"riot_id": "fresh#1", "puuid": "p1", "last_polled": now},
+        {"riot_id": "stale#1", "puuid": "p2", "last_polled": now - 3600},
+        {"riot_id": "new#1", "puuid": "p3", "last_polled": None},
+    ]
+    bot.guild_updates_finished.clear()
+    status = MagicMock(edit=AsyncMock())
+    mock_ctx.send.return_value = status
+    change = {
+        "old_tier": "GOLD",
+        "old_rank": "II",
+        "old_lp": 90,
+        "new_tier": "GOLD",
+        "new_rank": "I",
+        "new_lp": 10,
+    }
+
+    async def fake_refresh_user(user, channels=None):
+        assert channels == []
+        return change if user["riot_id"] == "stale#1" else None
+
+    with (
+        patch(
+            "bot.refresh_tracked_user",
+            new_callable=AsyncMock,
+            side_effect=fake_refresh_user,
+        ) as fake_refresh,
+        patch.object(bot.warehouse, "flush"),
+    ):
+        await update(mock_ctx)
+    refreshed = [call.args[0]["riot_id"] for call in fake_refresh.call_args_list]
+    assert sorted(refreshed) == ["new#1", "stale#1"]
+    mock_ctx.send.assert_called_once()
+    assert status.edit.call_args.kwargs["content"] == (
+        "Ranked information has been updated: 2 refreshed, "
+        "1 already up to date, 1 changed\n"
+        "stale#1: GOLD II 90 LP → GOLD I 10 LP"
+    )
+    # A second call within the cooldown does not start another run
+    await update(mock_ctx)
+    assert fake_refresh.call_count == 2
+    assert "was updated" in mock_ctx.send.call_args.args[0]
+
+
+def test_warm_state_survives_json_round_trip():
+    bot.champion_names = {103: "Ahri"}
+    bot.scout_cache.set(("puuid-1", 10), {"games": 3})
+    bot.last_sweep_finished = 1234.0
+    state = json.loads(json.dumps(bot.warm_state()))
+    bot.champion_names = None
+    bot.scout_cache.clear()
+    bot.restore_warm_state(state)
+    assert bot.champion_names == {103: "Ahri"}
+    assert bot.scout_cache.get(("puuid-1", 10)) == {"games": 3}
+    assert bot.last_sweep_finished == 1234.0
+
+
+def test_record_lp_history_skips_unchanged_score(mock_db):
+    ranked_data = {"tier": "GOLD", "rank": "II", "LP": 42}
+    mock_db.get_latest_lp_history_chunk.return_value = None
+    record_lp_history("puuid-1", ranked_data)
+    saved = mock_db.save_lp_history_chunk.call_args.args[0]
+    assert saved["count"] == 1
+    # Re-tracking the same player without any LP change adds nothing
+    mock_db.get_latest_lp_history_chunk.return_value = saved
+    record_lp_history("puuid-1", ranked_data)
+    assert mock_db.save_lp_history_chunk.call_count == 1
+    mock_db.get_lp_history.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_sigterm_closes_the_bot():
+    with patch.object(bot, "close", new_callable=AsyncMock) as fake_close:
+        bot.close_from_signal()
+        await bot.shutdown_task
+    fake_close.assert_awaited_once()
+    bot.shutdown_task = None
+
+
+@pytest.mark.asyncio
+async def test_sweep_skips_players_refreshed_since_it_started(mock_db):
+    stale = {"riot_id": "bob#boom", "puuid": "p1", "tier": "GOLD", "LP": 10}
+    # A post-game check already stored the new rank after the roster was read
+    fresh = dict(stale, LP=30, last_polled=time.time())
+    mock_db.get_bot_state.return_value = None
+    mock_db.get_all_tracked_users.return_value = [stale]
+    mock_db.get_tracked_user.return_value = fresh
+    with (
+        patch("bot.refresh_tracked_user", new_callable=AsyncMock) as fake_refresh,
+        patch.object(bot, "warehouse"),
+    ):
+        await bot.background_update_task.coro(bot)
+    fake_refresh.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_tracked_roster_is_cached_until_tracking_changes(mock_ctx, mock_db):
+    bot.tracked_users = None
+    mock_db.get_all_tracked_users.return_value = [{"riot_id": "bob#boom"}]
+    assert bot.tracked_roster() == [{"riot_id": "bob#boom"}]
+    bot.tracked_roster()
+    assert mock_db.get_all_tracked_users.call_count == 1
+    with (
+        patch("bot.get_puuid", new_callable=AsyncMock, return_value="puuid-amy"),
+        patch(
+            "bot.get_ranked_info",
+            new_callable=AsyncMock,
+            return_value={"tier": "GOLD", "rank": "II", "LP": 42},
+        ),
+    ):
+        await track(mock_ctx, riot_id="amy#tag")
+    bot.tracked_roster()
+    assert mock_db.get_all_tracked_users.call_count == 2
+    bot.tracked_users = None
+
+
+@pytest.mark.asyncio
+async def test_update_attaches_repeat_callers(mock_ctx, mock_db):
+    running = asyncio.get_running_loop().create_future()
+    bot.guild_updates_running[mock_ctx.guild.id] = running
+    mock_ctx.message = MagicMock(add_reaction=AsyncMock())
+    try:
+        waiter = asyncio.ensure_future(update(mock_ctx))
+        await asyncio.sleep(0)
+        mock_ctx.message.add_reaction.assert_awaited_once_with("⏳")
+        running.set_result(None)
+        await waiter
+    finally:
+        bot.guild_updates_running.clear()
+    mock_ctx.send.assert_not_called()
+    mock_ctx.message.add_reaction.assert_awaited_with("✅")
+    mock_db.get_guild_tracked_users.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_scout_includes_buffered_matches(mock_ctx, tmp_path):
+    warehouse = MatchWarehouse(str(tmp_path))
+    warehouse.add_match(make_match("NA1_1", 100, "Ahri", True))
+    warehouse.flush()
+    # The sweep buffered the newest game without flushing it
+    warehouse.add_match(make_match("NA1_2", 200, "Zed", False))
+    bot.puuid_cache.set("bob#boom", "target")
+    bot.scout_cache.clear()
+    with (
+        patch.object(bot, "warehouse", warehouse),
+        patch(
+            "bot.get_match_ids",
+            new_callable=AsyncMock,
+            return_value=["NA1_2", "NA1_1"],
+        ),
+        patch("bot.get_matches", new_callable=AsyncMock) as fake_get_matches,
+    ):
+        await scout(mock_ctx, riot_id="bob#boom 2")
+    fake_get_matches.assert_not_called()
+    embed = mock_ctx.send.call_args.kwargs["embed"]
+    assert embed.description.startswith("Last 2 ranked games")
+    bot.scout_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_close_flushes_the_warehouse():
+    with (
+        patch("bot.db", None),
+        patch.object(bot, "session", None),
+        patch.object(bot, "warehouse") as fake_warehouse,
+        patch.object(bot, "graph_renderer"),
+        patch.object(bot, "watchdog"),
+        patch.object(commands.AutoShardedBot, "close", new_callable=AsyncMock),
+    ):
+        fake_warehouse.flush.return_value = 10
+        await bot.close()
+    fake_warehouse.flush.assert_called_once()
@@ -0,0 +1,153 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from database import FirestoreStorage, SQLiteStorage, Storage, normalize_user_doc
+
+RANKED_DATA = {"tier": "GOLD", "rank": "IV", "LP": 20}
+
+
+@pytest.fixture
+def storage():
+    storage = SQLiteStorage(":memory:")
+    yield storage
+    storage.close()
+
+
+def test_sqlite_track_user(storage):
+    storage.track_user("bob#boom", "puuid1", RANKED_DATA, 123, 1)
+    user = storage.get_tracked_user("bob#boom")
+    assert user["puuid"] == "puuid1"
+    assert user["tier"] == "GOLD"
+    assert user["rank"] == "IV"
+    assert user["LP"] == 20
+    assert user["guild_ids"] == ["123"]
+    assert user["server_info"]["123"]["added_by"] == 1
+
+
+def test_sqlite_guild_membership(storage):
+    storage.track_user("bob#boom", "puuid1", RANKED_DATA, 123, 1)
+    storage.track_user("bob#boom", "puuid1", RANKED_DATA, 456, 2)
+    storage.track_user("amy#tag", "puuid2", RANKED_DATA, 456, 2)
+    assert [u["riot_id"] for u in storage.get_guild_tracked_users(123)] == [
+        "bob#boom",
+    ]
+    assert [u["riot_id"] for u in storage.get_guild_tracked_users(456)] == [
+        "amy#tag",
+        "bob#boom",
+    ]
+    assert len(storage.get_all_tracked_users()) == 2
+
+
+def test_sqlite_untrack_user(storage):
+    storage.track_user("bob#boom", "puuid1", RANKED_DATA, 123, 1)
+    storage.track_user("bob#boom", "puuid1", RANKED_DATA, 456, 2)
+    assert not storage.untrack_user("bob#boom", 789)  # not tracked in this guild
+    assert storage.untrack_user("bob#boom", 123)
+    assert storage.get_tracked_user("bob#boom")["guild_ids"] == ["456"]
+    assert storage.untrack_user("bob#boom", 456)
+    assert storage.get_tracked_user("bob#boom") is None  # last guild removes user
+
+
+def test_sqlite_update_ranked_info(storage):
+    storage.track_user("bob#boom", "puuid1", RANKED_DATA, 123, 1)
+    storage.update_ranked_info("bob#boom", {"tier": "GOLD", "rank": "III", "LP": 5})
+    user = storage.get_tracked_user("bob#boom")
+    assert (user["tier"], user["rank"], user["LP"]) == ("GOLD", "III", 5)
+
+
+def test_sqlite_update_channel(storage):
+    assert storage.get_update_channel(123) is None
+    storage.set_update_channel(123, 999)
+    storage.set_update_channel(123, 1000)
+    assert storage.get_update_channel(123) == 1000
+
+
+def test_sqlite_last_polled(storage):
+    storage.track_user("bob#boom", "puuid1", RANKED_DATA, 123, 1)
+    assert storage.get_tracked_user("bob#boom")["last_polled"] is None
+    storage.update_ranked_info("bob#boom", RANKED_DATA, polled_at=1000.0)
+    storage.update_ranked_info("bob#boom", RANKED_DATA)  # keeps the timestamp
+    assert storage.get_tracked_user("bob#boom")["last_polled"] == 1000.0
+
+
+def test_sqlite_bot_state(storage):
+    assert storage.get_bot_state("sweep") is None
+    storage.set_bot_state("sweep", {"cursor": "bob#boom"})
+    assert storage.get_bot_state("sweep") == {"cursor": "bob#boom"}
+
+
+def test_sqlite_lp_history_round_trip(storage):
+    chunk = {
+        "puuid": "puuid1",
+        "season": "2026",
+        "index": 0,
+        "count": 2,
+        "start_ts": 100,
+        "end_ts": 160,
+        "first_score": 1000,
+        "last_score": 980,
+        "min_score": 980,
+        "max_score": 1000,
+        "ts_deltas": [0, 60],
+        "score_deltas": [0, -20],
+    }
+    storage.save_lp_history_chunk(chunk)
+    assert storage.get_lp_history("puuid1", "2026") == [chunk]
+    assert storage.get_lp_history("puuid1", "2025") == []
+    assert storage.get_latest_lp_history_chunk("puuid1", "2025") is None
+    storage.save_lp_history_chunk({**chunk, "index": 1})
+    assert storage.get_latest_lp_history_chunk("puuid1", "2026")["index"] == 1
+
+
+def test_sqlite_track_users_batch(storage):
+    storage.track_users(
+        [("bob#boom", "puuid1", RANKED_DATA), ("amy#tag", "puuid2", RANKED_DATA)],
+        123,
+        1,
+    )
+    users = storage.get_guild_tracked_users(123)
+    assert [u["riot_id"] for u in users] == ["amy#tag", "bob#boom"]
+
+
+def test_storage_requires_every_method():
+    class PartialStorage(Storage):
+        def get_tracked_user(self, _riot_id):
+            return None
+
+    with pytest.raises(TypeError):
+        PartialStorage()
+
+
+def test_normalize_user_doc_folds_legacy_server_info():
+    data = {
+        "riot_id": "bob#tag",
+        "server_info.1": {"added_by": 10},
+        "server_info": {"2": {"added_by": 20}},
+    }
+    assert normalize_user_doc(data) == {
+        "riot_id": "bob#tag",
+        "server_info": {"1": {"added_by": 10}, "2": {"added_by": 20}},
+    }
+
+
+def test_firestore_latest_lp_history_chunk_reads_the_head_doc():
+    client = MagicMock()
+    storage = FirestoreStorage(client)
+    chunk = {"puuid": "puuid1", "season": "2026", "index": 3, "last_score": 10}
+    storage.save_lp_history_chunk(chunk)
+    batch = client.batch.return_value
+    assert batch.set.call_args_list[1].args[1] == {
+        "puuid": "puuid1",
+        "season": "2026",
+        "index": 3,
+    }
+    batch.commit.assert_called_once()
+    collection = client.collection.return_value
+    head = MagicMock(exists=True, to_dict=lambda: {"index": 3})
+    latest = MagicMock(exists=True, to_dict=lambda: chunk)
+    collection.document.return_value.get.side_effect = [head, latest]
+    assert storage.get_latest_lp_history_chunk("puuid1", "2026") == chunk
+    collection.document.assert_called_with("puuid1_2026_0003")
+    # No ordered query, which Firestore would need a composite index for
+    collection.where.assert_not_called()
@@ -0,0 +1,80 @@
+import os
+import subprocess
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from cache import TTLCache
+from graphing import GraphRenderer, render_lp_graph
+
+# Tests for the Cache
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_ttl_cache_expires_entries():
+    cache = TTLCache(ttl=10)
+    with patch("cache.time.time", return_value=100):
+        cache.set("a", 1)
+    with patch("cache.time.time", return_value=105):
+        assert cache.get("a") == 1
+    with patch("cache.time.time", return_value=111):
+        assert cache.get("a") is None
+
+
+# Tests for Rendering
+
+
+def test_render_lp_graph_returns_png():
+    pytest.importorskip("matplotlib")
+    image = render_lp_graph(
+        "LP History",
+        [0, 3600, 7200],
+        [1300, 1320, 1290],
+        [1300],
+        ["GOLD III"],
+    )
+    assert image.startswith(b"\x89PNG")
+
+
+@pytest.mark.asyncio
+async def test_graph_renderer_caches_per_version():
+    renderer = GraphRenderer()
+    with (
+        patch.object(renderer, "_get_executor", return_value=None),
+        patch(
+            "graphing.render_lp_graph",
+            side_effect=[b"v1", b"v2"],
+        ) as fake_render,
+    ):
+        assert await renderer.render("puuid", 1, "title") == b"v1"
+        assert await renderer.render("puuid", 1, "title") == b"v1"
+        assert await renderer.render("puuid", 2, "title") == b"v2"
+    assert fake_render.call_count == 2
+
+
+def test_worker_entry_does_not_import_bot():
+    # Pool workers re-run the entry script as __mp_main__
+    script = (
+        "import runpy, sys; "
+        "runpy.run_path('main.py', run_name='__mp_main__'); "
+        "print('bot' in sys.modules)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+    )
+    assert result.stdout.strip() == "False"
@@ -0,0 +1,84 @@
+from history import (
+    CHUNK_SIZE,
+    append_point,
+    decode_chunk,
+    describe_score,
+    ladder_score,
+    summarize_history,
+)
+
+# Tests for Ladder Scores
+
+
+def test_ladder_score_ordering():
+    assert ladder_score("GOLD", "IV", 99) < ladder_score("GOLD", "III", 0)
+    assert ladder_score("GOLD", "I", 99) < ladder_score("PLATINUM", "IV", 0)
+    assert ladder_score("DIAMOND", "I", 99) < ladder_score("MASTER", "I", 0)
+    assert ladder_score("UNRANKED", "", 0) is None
+
+
+def test_describe_score_round_trip():
+    assert describe_score(ladder_score("GOLD", "II", 42)) == "GOLD II 42 LP"
+    assert describe_score(ladder_score("CHALLENGER", "I", 900)) == "MASTER+ 900 LP"
+
+
+# Tests for Chunk Encoding
+
+
+def test_append_point_delta_encodes():
+    chunks = []
+    for ts, score in [(100, 1000), (160, 1020), (300, 990)]:
+        append_point(chunks, "puuid", "2026", ts, score)
+    assert len(chunks) == 1
+    chunk = chunks[0]
+    assert chunk["ts_deltas"] == [0, 60, 140]
+    assert chunk["score_deltas"] == [0, 20, -30]
+    assert chunk["max_score"] == 1020
+    assert decode_chunk(chunk) == ([100, 160, 300], [1000, 1020, 990])
+
+
+def test_append_point_rolls_over_full_chunk():
+    chunks = []
+    for i in range(CHUNK_SIZE + 1):
+        saved = append_point(chunks, "puuid", "2026", i, i)
+    assert len(chunks) == 2
+    assert saved is chunks[1]
+    assert saved["index"] == 1
+    assert saved["first_score"] == CHUNK_SIZE
+
+
+# Tests for Range Queries
+
+
+def test_summarize_history_window():
+    chunks = []
+    for ts, score in [(0, 1000), (10, 1100), (20, 1050), (30, 1080)]:
+        append_point(chunks, "puuid", "2026", ts, score)
+    summary = summarize_history(chunks, since=15)
+    assert summary["current"] == 1080
+    assert summary["peak"] == 1100  # player sat at 1100 when the window opened
+    assert summary["net"] == -20
+    assert summary["changes"] == 2
+
+
+def test_summarize_history_uses_chunk_metadata():
+    chunks = []
+    for i in range(CHUNK_SIZE * 2):
+        append_point(chunks, "puuid", "2026", i, i)
+    # Break the decoded data of the first chunk, which lies fully inside the window
+    chunks[0]["score_deltas"] = None
+    summary = summarize_history(chunks, since=0)
+    assert summary["changes"] == CHUNK_SIZE * 2 - 1
+    assert summary["peak"] == CHUNK_SIZE * 2 - 1
+    assert summary["net"] == CHUNK_SIZE * 2 - 1
+    assert summarize_history([], since=0) is None
+
+
+def test_summarize_history_does_not_count_the_baseline():
+    chunks = []
+    # The point written by !track, then a single LP change
+    append_point(chunks, "puuid", "2026", 100, 1000)
+    append_point(chunks, "puuid", "2026", 200, 1020)
+    assert summarize_history(chunks, since=0)["changes"] == 1
+    assert summarize_history(chunks, since=150)["changes"] == 1
+    assert summarize_history(chunks, since=300)["changes"] == 0
@@ -0,0 +1,56 @@
+from live import (
+    COLD_POLL_SECONDS,
+    HOT_POLL_SECONDS,
+    IN_GAME_POLL_SECONDS,
+    POST_GAME_DELAY_SECONDS,
+    POST_GAME_TIMEOUT_SECONDS,
+    RANKED_SOLO_QUEUE_ID,
+    LiveGameTracker,
+)
+
+USER = {"riot_id": "bob#boom", "puuid": "puuid1"}
+RANKED_GAME = {"gameId": 42, "gameQueueConfigId": RANKED_SOLO_QUEUE_ID}
+
+
+def test_unknown_players_are_due_then_go_cold():
+    tracker = LiveGameTracker()
+    assert tracker.due_players([USER], now=0) == [USER]
+    assert tracker.record_check(USER, None, now=0) is None
+    assert tracker.next_check["puuid1"] >= COLD_POLL_SECONDS * 0.75
+    assert tracker.due_players([USER], now=60) == []
+
+
+def test_active_players_are_polled_sooner():
+    tracker = LiveGameTracker()
+    tracker.record_check(USER, None, now=0)
+    tracker.mark_active("puuid1", now=10)
+    assert tracker.next_check["puuid1"] <= 10 + HOT_POLL_SECONDS
+    tracker.record_check(USER, None, now=20)
+    assert tracker.next_check["puuid1"] == 20 + HOT_POLL_SECONDS
+
+
+def test_game_start_and_end_queue_post_game_check():
+    tracker = LiveGameTracker()
+    assert tracker.record_check(USER, RANKED_GAME, now=0) == "started"
+    assert tracker.next_check["puuid1"] == IN_GAME_POLL_SECONDS
+    assert tracker.record_check(USER, RANKED_GAME, now=120) is None
+    assert tracker.record_check(USER, None, now=1800) == "ended"
+    assert tracker.post_game_due(now=1800) == []
+    assert tracker.post_game_due(now=1800 + POST_GAME_DELAY_SECONDS) == ["bob#boom"]
+    tracker.resolve_finished("bob#boom")
+    assert tracker.post_game_due(now=1800 + POST_GAME_DELAY_SECONDS) == []
+
+
+def test_post_game_check_times_out():
+    tracker = LiveGameTracker()
+    tracker.record_check(USER, RANKED_GAME, now=0)
+    tracker.record_check(USER, None, now=100)
+    assert tracker.post_game_due(now=100 + POST_GAME_TIMEOUT_SECONDS) == []
+    assert tracker.finished == {}
+
+
+def test_unranked_games_are_ignored():
+    tracker = LiveGameTracker()
+    aram = {"gameId": 7, "gameQueueConfigId": 450}
+    assert tracker.record_check(USER, aram, now=0) is None
+    assert tracker.in_game == {}
@@ -0,0 +1,46 @@
+import json
+import logging
+
+from logger_config import (
+    CorrelationFilter,
+    JSONFormatter,
+    RecordQueueHandler,
+    SamplingFilter,
+    correlation_id,
+)
+
+
+def make_record(level=logging.WARNING, msg="Rate Limit Hit!", lineno=10):
+    return logging.LogRecord("root", level, "utils.py", lineno, msg, None, None)
+
+
+def test_sampling_filter_caps_repeated_records():
+    sampling = SamplingFilter(limit=2, window=60)
+    allowed = [sampling.filter(make_record()) for _ in range(5)]
+    assert allowed == [True, True, False, False, False]
+    # Other call sites and errors are unaffected
+    assert sampling.filter(make_record(lineno=11))
+    assert sampling.filter(make_record(level=logging.ERROR))
+
+
+def test_sampling_filter_reports_suppressed_records():
+    sampling = SamplingFilter(limit=1, window=0)
+    sampling._sites[("utils.py", 10)] = (0, 1, 3)
+    record = make_record()
+    assert sampling.filter(record)
+    assert record.getMessage() == "Rate Limit Hit! (3 similar messages suppressed)"
+
+
+def test_json_formatter_includes_correlation_id():
+    token = correlation_id.set("sweep-1234")
+    try:
+        record = make_record(msg="Polling %s")
+        record.args = ("bob#tag",)
+        CorrelationFilter().filter(record)
+    finally:
+        correlation_id.reset(token)
+    prepared = RecordQueueHandler(None).prepare(record)
+    entry = json.loads(JSONFormatter().format(prepared))
+    assert entry["message"] == "Polling bob#tag"
+    assert entry["correlation_id"] == "sweep-1234"
+    assert entry["level"] == "WARNING"
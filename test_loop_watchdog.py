@@ -0,0 +1,55 @@
+import asyncio
+import os
+import time
+from unittest.mock import patch
+
+import pytest
+
+from loop_watchdog import PROJECT_DIR, LoopWatchdog, is_project_file
+
+
+def block_the_loop():
+    time.sleep(0.3)
+
+
+@pytest.mark.asyncio
+async def test_watchdog_reports_blocking_frame():
+    watchdog = LoopWatchdog(threshold=0.1, interval=0.02)
+    with (
+        patch.object(watchdog, "report", wraps=watchdog.report) as fake_report,
+        patch("sentry_sdk.capture_message") as fake_capture,
+    ):
+        watchdog.start()
+        try:
+            await asyncio.sleep(0.05)
+            block_the_loop()
+            await asyncio.sleep(0.1)
+        finally:
+            watchdog.stop()
+    assert watchdog.stalls == 1
+    culprit = fake_report.call_args.args[1]
+    assert culprit.f_code.co_name == "block_the_loop"
+    assert "block_the_loop" in fake_capture.call_args.args[0]
+    assert watchdog.max_lag >= 0.2
+
+
+@pytest.mark.asyncio
+async def test_watchdog_ignores_healthy_loop():
+    watchdog = LoopWatchdog(threshold=0.1, interval=0.02)
+    with patch.object(watchdog, "report") as fake_report:
+        watchdog.start()
+        try:
+            await asyncio.sleep(0.2)
+        finally:
+            watchdog.stop()
+    fake_report.assert_not_called()
+
+
+def test_is_project_file_skips_installed_packages():
+    assert is_project_file(os.path.join(PROJECT_DIR, "bot.py"))
+    assert not is_project_file(
+        os.path.join(PROJECT_DIR, ".venv", "lib", "site-packages", "aiohttp", "x.py"),
+    )
+    assert not is_project_file(os.path.join(PROJECT_DIR, "dist-packages", "x.py"))
+    # A sibling directory sharing the project's name as a prefix isn't ours
+    assert not is_project_file(PROJECT_DIR.rstrip(os.sep) + "-old/bot.py")
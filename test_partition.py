@@ -0,0 +1,53 @@
+import pytest
+
+from database import SQLiteStorage
+from partition import PartitionLeaser, parse_shard_ids, partition_for
+
+
+@pytest.fixture
+def storage():
+    storage = SQLiteStorage(":memory:")
+    yield storage
+    storage.close()
+
+
+def test_partition_for_is_stable():
+    assert partition_for("puuid1", 64) == partition_for("puuid1", 64)
+    assert 0 <= partition_for("puuid1", 64) < 64
+    assert len({partition_for(f"puuid{i}", 8) for i in range(200)}) == 8
+
+
+def test_parse_shard_ids():
+    assert parse_shard_ids(None) is None
+    assert parse_shard_ids("0-2, 5") == [0, 1, 2, 5]
+
+
+def test_workers_split_partitions(storage):
+    a = PartitionLeaser(storage, "a", 8, lease_seconds=90)
+    b = PartitionLeaser(storage, "b", 8, lease_seconds=90)
+    assert len(a.rebalance(now=0)) == 8  # alone, a takes everything
+    b.rebalance(now=10)  # a's leases are live, nothing free yet
+    a.rebalance(now=20)  # a sees b and sheds down to its fair share
+    b.rebalance(now=30)
+    assert len(a.owned) == 4
+    assert len(b.owned) == 4
+    assert a.owned.isdisjoint(b.owned)
+
+
+def test_dead_worker_partitions_fail_over(storage):
+    a = PartitionLeaser(storage, "a", 4, lease_seconds=90)
+    b = PartitionLeaser(storage, "b", 4, lease_seconds=90)
+    a.rebalance(now=0)
+    b.rebalance(now=10)
+    a.rebalance(now=20)
+    b.rebalance(now=30)
+    # a stops renewing, once its leases expire b owns everything
+    assert len(b.rebalance(now=200)) == 4
+
+
+def test_release_all_hands_partitions_over(storage):
+    a = PartitionLeaser(storage, "a", 4, lease_seconds=90)
+    b = PartitionLeaser(storage, "b", 4, lease_seconds=90)
+    a.rebalance(now=0)
+    a.release_all(now=5)
+    assert len(b.rebalance(now=10)) == 4
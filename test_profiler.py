@@ -0,0 +1,43 @@
+import sys
+import threading
+import time
+
+from profiler import ProfileCapture, SamplingProfiler
+
+
+def busy_loop(seconds):
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        pass
+
+
+def test_record_builds_folded_stacks():
+    profiler = SamplingProfiler(threading.get_ident())
+    frame = sys._getframe()
+    profiler.record(frame)
+    profiler.record(frame)
+    stack, count = profiler.folded().strip().rsplit(" ", 1)
+    assert count == "2"
+    assert stack.endswith("test_profiler.py:test_record_builds_folded_stacks")
+    top = dict(profiler.top_functions(limit=None))
+    assert top["test_profiler.py:test_record_builds_folded_stacks"] == 2
+
+
+def test_capture_samples_only_armed_runs(tmp_path):
+    capture = ProfileCapture()
+    capture.begin("sweep")  # not armed, nothing happens
+    assert capture.end("sweep") is None
+    assert capture.arm("sweep", 2, threading.get_ident())
+    assert not capture.arm("commands", 1, threading.get_ident())
+    for _ in range(2):
+        capture.begin("sweep")
+        busy_loop(0.05)
+        result = capture.end("sweep")
+    target, profiler, channel = result
+    assert (target, channel) == ("sweep", None)
+    assert capture.target is None
+    assert profiler.samples > 0
+    assert "test_profiler.py:busy_loop" in dict(profiler.top_functions(limit=None))
+    path = profiler.save(tmp_path, target)
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == profiler.folded()
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from resilience import CircuitBreaker, backoff_delay, hedged
+
+
+def test_backoff_delay_is_capped():
+    for attempt in range(10):
+        assert 0 <= backoff_delay(attempt, base=0.5, cap=4) <= 4
+
+
+def test_circuit_breaker_opens_and_probes():
+    breaker = CircuitBreaker("host", failure_threshold=2, reset_seconds=30)
+    breaker.record_failure(now=0)
+    assert breaker.allow(now=1)
+    breaker.record_failure(now=1)
+    assert breaker.is_open
+    assert not breaker.allow(now=10)
+    # Once the window passes a single probe goes through
+    assert breaker.allow(now=31)
+    assert not breaker.allow(now=32)
+    breaker.record_failure(now=32)
+    assert not breaker.allow(now=50)
+    assert breaker.allow(now=62)
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.allow(now=63)
+
+
+@pytest.mark.asyncio
+async def test_hedged_returns_fastest_result():
+    calls = []
+
+    async def make_call():
+        calls.append(len(calls))
+        if len(calls) == 1:
+            await asyncio.sleep(1)
+            return "slow"
+        return "fast"
+
+    assert await hedged(make_call, 0.01) == "fast"
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_hedged_skips_hedge_for_fast_calls():
+    calls = []
+
+    async def make_call():
+        calls.append(1)
+        return "ok"
+
+    assert await hedged(make_call, 0.5) == "ok"
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_hedged_falls_back_when_one_copy_fails():
+    calls = []
+
+    async def make_call():
+        calls.append(1)
+        if len(calls) == 1:
+            await asyncio.sleep(0.05)
+            return "first"
+        raise RuntimeError("boom")
+
+    assert await hedged(make_call, 0.01) == "first"
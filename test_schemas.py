@@ -0,0 +1,30 @@
+from schemas import MATCH_SCHEMA, fields, json_loads, project
+
+
+def test_project_keeps_only_schema_fields():
+    value = {"a": 1, "b": {"c": 2, "d": 3}, "e": [{"f": 4, "g": 5}], "h": 6}
+    schema = {"a": None, "b": fields("c"), "e": fields("f"), "missing": None}
+    assert project(value, schema) == {"a": 1, "b": {"c": 2}, "e": [{"f": 4}]}
+
+
+def test_project_passes_through_without_schema():
+    assert project([1, 2], None) == [1, 2]
+    assert project(None, MATCH_SCHEMA) is None
+
+
+def test_match_schema_drops_unused_fields():
+    match_dto = json_loads(
+        '{"metadata": {"matchId": "NA1_1", "participants": ["p1"]},'
+        ' "info": {"gameCreation": 1, "gameDuration": 2, "queueId": 420,'
+        ' "frames": [], "participants": [{"puuid": "p1", "kills": 3,'
+        ' "perks": {"styles": []}, "challenges": {"kda": 3.0}}]}}',
+    )
+    assert project(match_dto, MATCH_SCHEMA) == {
+        "metadata": {"matchId": "NA1_1"},
+        "info": {
+            "gameCreation": 1,
+            "gameDuration": 2,
+            "queueId": 420,
+            "participants": [{"puuid": "p1", "kills": 3}],
+        },
+    }
@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from scouting import aggregate_scouting
+
+
+def make_row(champion, role, kills, deaths, assists, win):
+    return {
+        "champion": champion,
+        "role": role,
+        "kills": kills,
+        "deaths": deaths,
+        "assists": assists,
+        "win": win,
+    }
+
+
+def build_columns(rows):
+    return {
+        "champion": np.array([r["champion"] for r in rows], dtype=object),
+        "role": np.array([r["role"] for r in rows], dtype=object),
+        "kills": np.array([r["kills"] for r in rows], dtype=np.int16),
+        "deaths": np.array([r["deaths"] for r in rows], dtype=np.int16),
+        "assists": np.array([r["assists"] for r in rows], dtype=np.int16),
+        "win": np.array([r["win"] for r in rows], dtype=bool),
+    }
+
+
+def test_aggregate_scouting():
+    rows = [
+        make_row("Ahri", "MIDDLE", 10, 2, 5, True),
+        make_row("Ahri", "MIDDLE", 2, 5, 3, False),
+        make_row("Ahri", "MIDDLE", 6, 0, 6, True),
+        make_row("Zed", "MIDDLE", 8, 4, 0, False),
+        make_row("Garen", "TOP", 3, 3, 3, True),
+    ]
+    report = aggregate_scouting(build_columns(rows))
+    assert report["games"] == 5
+    assert report["win_rate"] == pytest.approx(0.6)
+    assert report["kda"] == pytest.approx((29 + 17) / 14)
+    ahri, garen, zed = report["champions"]
+    assert ahri["champion"] == "Ahri"
+    assert ahri["games"] == 3
+    assert ahri["win_rate"] == pytest.approx(2 / 3)
+    assert ahri["kda"] == pytest.approx((18 + 14) / 7)
+    assert garen["champion"] == "Garen"  # ties on games broken by win rate
+    assert zed["kda"] == pytest.approx(2.0)
+    assert report["roles"] == [("Mid", 0.8), ("Top", 0.2)]
+
+
+def test_aggregate_scouting_no_games():
+    assert aggregate_scouting(build_columns([])) is None
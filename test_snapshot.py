@@ -0,0 +1,49 @@
+import time
+
+from cache import TTLCache
+from live import LiveGameTracker
+from snapshot import decode_entries, load_snapshot, save_snapshot
+
+
+def test_snapshot_round_trip(tmp_path):
+    path = tmp_path / "warm_state.json"
+    cache = TTLCache(maxsize=10, ttl=60)
+    cache.set(("puuid", 10), {"games": 3, "roles": [("Mid", 1.0)]})
+    cache.set("bob#tag", "puuid-1")
+    tracker = LiveGameTracker()
+    tracker.mark_active("puuid-1", 100.0)
+    tracker.in_game["puuid-1"] = 42
+    save_snapshot(
+        str(path),
+        {"cache": cache.entries(), "live_tracker": tracker.snapshot()},
+    )
+
+    state = load_snapshot(str(path))
+    restored = TTLCache(maxsize=10, ttl=60)
+    restored.restore(decode_entries(state["cache"]))
+    restored_tracker = LiveGameTracker()
+    restored_tracker.restore(state["live_tracker"])
+    assert restored.get(("puuid", 10))["games"] == 3
+    assert restored.get("bob#tag") == "puuid-1"
+    assert restored_tracker.in_game == {"puuid-1": 42}
+    assert restored_tracker.next_check == tracker.next_check
+
+
+def test_restore_skips_expired_entries():
+    cache = TTLCache(maxsize=10, ttl=60)
+    now = time.time()
+    cache.restore([("old", 1, now - 1), ("fresh", 2, now + 60), ("forever", 3, None)])
+    assert cache.get("old") is None
+    assert cache.get("fresh") == 2
+    assert cache.get("forever") == 3
+
+
+def test_load_snapshot_ignores_stale_or_missing(tmp_path):
+    path = str(tmp_path / "warm_state.json")
+    assert load_snapshot(path) is None
+    save_snapshot(path, {"last_sweep_finished": 1.0}, now=1000.0)
+    assert load_snapshot(path, now=1060.0)["last_sweep_finished"] == 1.0
+    assert load_snapshot(path, now=1000.0 + 7 * 60 * 60) is None
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("{not json")
+    assert load_snapshot(path) is None
@@ -1,11 +1,17 @@
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
+import aiohttp
 import pytest
 
 from utils import (
+    CIRCUIT_BREAKERS,
+    CircuitOpenError,
     RateLimitError,
+    RiotAPIError,
     UserNotFoundError,
     call_riot_api,
+    get_matches,
     get_puuid,
     get_ranked_info,
     parse_riot_id,
@@ -29,6 +35,13 @@ def test_parse_riot_id_invalid():
 # Tests for API Functions
 
 
+@pytest.fixture(autouse=True)
+def reset_circuit_breakers():
+    CIRCUIT_BREAKERS.clear()
+    yield
+    CIRCUIT_BREAKERS.clear()
+
+
 @pytest.fixture
 def mock_session():
     session = MagicMock()
@@ -127,3 +140,92 @@ async def test_api_rate_limit_max_retries_exceeded(mock_session):
     with patch("asyncio.sleep", new_callable=AsyncMock), pytest.raises(RateLimitError):
         await call_riot_api(mock_session, "htpps://fakeurl.com", {})
     assert mock_session.get.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_api_retries_transient_errors(mock_session):
+    response_503 = AsyncMock()
+    response_503.status = 503
+    response_200 = AsyncMock()
+    response_200.status = 200
+    response_200.json.return_value = {"key": "value"}
+    mock_context = mock_session.get.return_value
+    mock_context.__aenter__.side_effect = [
+        aiohttp.ClientConnectionError(),
+        response_503,
+        response_200,
+    ]
+    with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
+        result = await call_riot_api(mock_session, "https://na1.example", {})
+    assert result == {"key": "value"}
+    assert mock_sleep.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_api_circuit_opens_after_repeated_failures(mock_session):
+    mock_response = mock_session.get.return_value.__aenter__.return_value
+    mock_response.status = 500
+    with patch("asyncio.sleep", new_callable=AsyncMock):
+        for _ in range(2):
+            with pytest.raises(RiotAPIError):
+                await call_riot_api(mock_session, "https://na1.example", {})
+        assert mock_session.get.call_count == 5
+        with pytest.raises(CircuitOpenError):
+            await call_riot_api(mock_session, "https://na1.example", {})
+        assert mock_session.get.call_count == 5
+        # Other regions are unaffected
+        mock_response.status = 200
+        mock_response.json.return_value = {}
+        assert await call_riot_api(mock_session, "https://euw1.example", {}) == {}
+
+
+@pytest.mark.asyncio
+async def test_get_matches_keeps_order():
+    async def fake_get_match(_session, match_id, _key, _hedge_after):
+        await asyncio.sleep(0.01 if match_id == "NA1_1" else 0)
+        return {"metadata": {"matchId": match_id}}
+
+    with patch("utils.get_match", side_effect=fake_get_match):
+        matches = await get_matches(MagicMock(), ["NA1_1", "NA1_2"], "KEY")
+    assert [m["metadata"]["matchId"] for m in matches] == ["NA1_1", "NA1_2"]
+
+
+def fake_response(status, body=None, delay=0, headers=None):
+    response = AsyncMock()
+    response.status = status
+    response.headers = headers or {}
+    response.json.return_value = body
+
+    async def enter():
+        await asyncio.sleep(delay)
+        return response
+
+    context_manager = MagicMock()
+    context_manager.__aenter__.side_effect = enter
+    context_manager.__aexit__.return_value = None
+    return context_manager
+
+
+@pytest.mark.asyncio
+async def test_call_riot_api_hedges_slow_request():
+    session = MagicMock()
+    session.get.side_effect = [
+        fake_response(200, {"copy": "slow"}, delay=1),
+        fake_response(200, {"copy": "fast"}),
+    ]
+    data = await call_riot_api(session, "https://na1.example", {}, hedge_after=0.01)
+    assert data == {"copy": "fast"}
+    assert session.get.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_call_riot_api_does_not_hedge_after_rate_limit():
+    session = MagicMock()
+    session.get.side_effect = [
+        fake_response(429, headers={"Retry-After": "0"}),
+        fake_response(200, {"copy": "retry"}, delay=0.05),
+    ]
+    data = await call_riot_api(session, "https://na1.example", {}, hedge_after=0.01)
+    # The retry is slower than hedge_after but isn't duplicated
+    assert data == {"copy": "retry"}
+    assert session.get.call_count == 2
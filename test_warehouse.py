@@ -0,0 +1,122 @@
+import os
+import shutil
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from scouting import aggregate_scouting
+from warehouse import MatchWarehouse, participant_rows
+
+
+def make_match(match_id, game_creation, target_champion, target_win):
+    participants = [
+        {
+            "puuid": "target",
+            "championName": target_champion,
+            "teamPosition": "MIDDLE",
+            "teamId": 100,
+            "kills": 5,
+            "deaths": 2,
+            "assists": 7,
+            "win": target_win,
+        },
+    ]
+    participants += [
+        {
+            "puuid": f"other{i}",
+            "championName": "Garen",
+            "teamPosition": "TOP",
+            "teamId": 200,
+            "kills": 1,
+            "deaths": 1,
+            "assists": 1,
+            "win": not target_win,
+        }
+        for i in range(9)
+    ]
+    return {
+        "metadata": {"matchId": match_id},
+        "info": {
+            "gameCreation": game_creation,
+            "gameDuration": 1800,
+            "queueId": 420,
+            "participants": participants,
+        },
+    }
+
+
+def test_participant_rows_one_per_player():
+    rows = participant_rows(make_match("NA1_1", 100, "Ahri", True))
+    assert len(rows) == 10
+    assert rows[0]["match_id"] == "NA1_1"
+    assert rows[0]["champion"] == "Ahri"
+    assert participant_rows(None) == []
+
+
+def test_warehouse_round_trip(tmp_path):
+    warehouse = MatchWarehouse(str(tmp_path))
+    assert warehouse.add_match(make_match("NA1_1", 100, "Ahri", True))
+    assert not warehouse.add_match(make_match("NA1_1", 100, "Ahri", True))
+    assert warehouse.flush() == 10
+    assert warehouse.add_match(make_match("NA1_2", 200, "Zed", False))
+    warehouse.flush()
+    # Each flush wrote its own segment
+    assert sorted(os.listdir(tmp_path)) == ["seg-000000-000000", "seg-000001-000001"]
+    # A fresh instance reads everything back from disk
+    reopened = MatchWarehouse(str(tmp_path))
+    assert reopened.has_match("NA1_1")
+    columns = reopened.player_columns("target")
+    assert list(columns["match_id"]) == ["NA1_2", "NA1_1"]  # most recent first
+    assert list(columns["champion"]) == ["Zed", "Ahri"]
+    assert list(columns["win"]) == [False, True]
+
+
+def test_warehouse_compacts_segments(tmp_path):
+    warehouse = MatchWarehouse(str(tmp_path))
+    with patch("warehouse.MAX_SEGMENTS", 2):
+        for i in range(3):
+            warehouse.add_match(make_match(f"NA1_{i}", i, "Ahri", True))
+            warehouse.flush()
+    assert os.listdir(tmp_path) == ["seg-000000-000002"]
+    assert isinstance(warehouse.columns()["kills"], np.memmap)
+    # A compaction that stopped before cleaning up leaves its inputs behind
+    warehouse.add_match(make_match("NA1_3", 3, "Zed", False))
+    warehouse.flush()
+    shutil.copytree(tmp_path / "seg-000003-000003", tmp_path / "seg-000002-000002")
+    reopened = MatchWarehouse(str(tmp_path))
+    columns = reopened.player_columns("target")
+    assert list(columns["match_id"]) == ["NA1_3", "NA1_2", "NA1_1", "NA1_0"]
+    assert list(columns["champion"]) == ["Zed", "Ahri", "Ahri", "Ahri"]
+
+
+def test_warehouse_feeds_scouting(tmp_path):
+    warehouse = MatchWarehouse(str(tmp_path))
+    warehouse.add_match(make_match("NA1_1", 100, "Ahri", True))
+    warehouse.add_match(make_match("NA1_2", 200, "Ahri", False))
+    warehouse.add_match(make_match("NA1_3", 300, "Zed", True))
+    warehouse.flush()
+    columns = warehouse.player_columns("target", match_ids=["NA1_1", "NA1_2"])
+    report = aggregate_scouting(columns)
+    assert report["games"] == 2
+    assert report["champions"][0]["champion"] == "Ahri"
+    assert report["win_rate"] == pytest.approx(0.5)
+    assert aggregate_scouting(warehouse.player_columns("unknown")) is None
+
+
+def test_warehouse_keeps_rows_when_a_flush_fails(tmp_path):
+    warehouse = MatchWarehouse(str(tmp_path))
+    warehouse.add_match(make_match("NA1_1", 100, "Ahri", True))
+    with (
+        patch("warehouse.np.save", side_effect=OSError("disk full")),
+        pytest.raises(OSError),
+    ):
+        warehouse.flush()
+    assert warehouse.has_match("NA1_1")
+    warehouse.add_match(make_match("NA1_2", 200, "Zed", False))
+    assert warehouse.flush() == 20
+    reopened = MatchWarehouse(str(tmp_path))
+    columns = reopened.player_columns("target")
+    assert list(columns["match_id"]) == ["NA1_2", "NA1_1"]
+    assert list(columns["champion"]) == ["Zed", "Ahri"]
+    assert len(reopened.player_columns("other0")["match_id"]) == 2
@@ -1,8 +1,11 @@
 import asyncio
+from urllib.parse import urlsplit
 
 import aiohttp
 
 from logger_config import logger
+from resilience import CircuitBreaker, backoff_delay, hedged
+from schemas import ACTIVE_GAME_SCHEMA, MATCH_SCHEMA, json_loads, project
 
 # Custom Exceptions
 
@@ -22,58 +25,197 @@ class RateLimitError(RiotAPIError):
     pass
 
 
+class CircuitOpenError(RiotAPIError):
+    # Riot host is failing, calls are paused
+    pass
+
+
+# Ranking Helpers
+
+TIER_ORDER = {
+    "CHALLENGER": 9,
+    "GRANDMASTER": 8,
+    "MASTER": 7,
+    "DIAMOND": 6,
+    "EMERALD": 5,
+    "PLATINUM": 4,
+    "GOLD": 3,
+    "SILVER": 2,
+    "BRONZE": 1,
+    "IRON": 0,
+    "UNRANKED": -1,
+}
+RANK_ORDER = {"I": 4, "II": 3, "III": 2, "IV": 1, "": 0}
+
+
 # Core API Function
 
+# Server-side statuses worth retrying, anything else is a real answer
+TRANSIENT_STATUSES = {500, 502, 503, 504}
+
+# One breaker per Riot host, so an outage in one region doesn't pause the others
+CIRCUIT_BREAKERS = {}
+
+
+def circuit_breaker_for(url):
+    host = urlsplit(url).netloc
+    breaker = CIRCUIT_BREAKERS.get(host)
+    if breaker is None:
+        breaker = CIRCUIT_BREAKERS[host] = CircuitBreaker(host)
+    return breaker
+
+
+async def call_riot_api(
+    session,
+    url,
+    headers,
+    retries=3,
+    schema=None,
+    hedge_after=None,
+):
+    """Calls a Riot endpoint with retries, backoff and a per-host circuit breaker.
 
-async def call_riot_api(session, url, headers, retries=3):
-    for _attempt in range(retries):
+    Args:
+        session: The shared aiohttp session.
+        url: Endpoint to call.
+        headers: Request headers, see ``riot_headers``.
+        retries: Attempts before giving up.
+        schema: Optional ``schemas`` projection applied to the decoded body so
+            only the fields the caller needs are kept.
+        hedge_after: Seconds before the first request gets a duplicate, see
+            ``resilience.hedged``. Only the first attempt is hedged, once Riot
+            rate limits us or a retry is needed no duplicates are sent.
+
+    Returns:
+        The decoded (and projected) response, or None for a 404.
+    """
+    breaker = circuit_breaker_for(url)
+    last_error = None
+
+    async def request():
+        async with session.get(url, headers=headers) as response:
+            body = None
+            if response.status == 200:
+                body = await response.json(loads=json_loads)
+            return response.status, response.headers, body
+
+    for attempt in range(retries):
+        if not breaker.allow():
+            raise CircuitOpenError(
+                f"Riot API host {breaker.name} is unavailable, retrying in "
+                f"{breaker.retry_in():.0f} seconds.",
+            )
         try:
-            async with session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                elif response.status == 429:
-                    retry_after = int(response.headers.get("Retry-After", 1))
-                    logger.warning(
-                        f"⚠️ Rate Limit Hit! Sleeping for {retry_after} seconds...",
-                    )
-                    await asyncio.sleep(retry_after)
-                    continue
-                # other errors - dont retry
-                elif response.status == 404:
-                    return None
-                elif response.status == 403:
-                    raise RiotAPIError("Riot API Key is invalid or expired.")
-                else:
-                    raise RiotAPIError(f"Riot API Error {response.status}: {url}")
-        except aiohttp.ClientError as e:
-            raise RiotAPIError("Network Connection Failed") from e
+            # The hedge timer only covers the raw request, never our own sleeps
+            status, response_headers, body = await hedged(
+                request,
+                hedge_after if attempt == 0 else None,
+            )
+            if status == 200:
+                breaker.record_success()
+                return project(body, schema)
+            elif status == 429:
+                # Rate limiting is not a host failure, wait as instructed
+                last_error = None
+                retry_after = int(response_headers.get("Retry-After", 1))
+                logger.warning(
+                    f"⚠️ Rate Limit Hit! Sleeping for {retry_after} seconds...",
+                )
+                await asyncio.sleep(retry_after)
+                continue
+            # other errors - dont retry
+            elif status == 404:
+                breaker.record_success()
+                return None
+            elif status == 403:
+                raise RiotAPIError("Riot API Key is invalid or expired.")
+            elif status in TRANSIENT_STATUSES:
+                last_error = RiotAPIError(f"Riot API Error {status}: {url}")
+            else:
+                raise RiotAPIError(f"Riot API Error {status}: {url}")
+        except (aiohttp.ClientError, TimeoutError) as e:
+            last_error = RiotAPIError("Network Connection Failed")
+            last_error.__cause__ = e
+        breaker.record_failure()
+        if attempt + 1 < retries:
+            delay = backoff_delay(attempt)
+            logger.warning(
+                f"⚠️ Riot API call failed ({last_error}), "
+                f"retrying in {delay:.1f} seconds...",
+            )
+            await asyncio.sleep(delay)
+    if last_error is not None:
+        raise last_error
     raise RateLimitError("Max retries exceeded for Riot API.")
 
 
 # Specific Data Fetchers
 
+# Upper bound on in-flight requests for fan-out fetches such as match history
+MATCH_FETCH_CONCURRENCY = 8
+# Interactive match fetches slower than this get a duplicate request, the first
+# answer wins
+MATCH_HEDGE_SECONDS = 2.0
 
-async def get_recent_match_info(session, puuid, riot_api_key):
-    api_url = f"https://americas.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids?queue=420&count=1"
-    headers = {
+
+def riot_headers(riot_api_key):
+    return {
         "X-Riot-Token": riot_api_key,
         "Accept": "application/json",
         "User-Agent": "LeagueHelperApp/1.0",
     }
-    match_id = await call_riot_api(session, api_url, headers)
-    api_url = f"https://americas.api.riotgames.com/lol/match/v5/matches/{match_id[0]}"
-    match_info = await call_riot_api(session, api_url, headers)
+
+
+async def get_match_ids(session, puuid, riot_api_key, count=1):
+    """Returns the ids of a player's most recent ranked solo queue matches."""
+    api_url = f"https://americas.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids?queue=420&count={count}"
+    match_ids = await call_riot_api(session, api_url, riot_headers(riot_api_key))
+    return match_ids or []
+
+
+async def get_match(session, match_id, riot_api_key, hedge_after=None):
+    api_url = f"https://americas.api.riotgames.com/lol/match/v5/matches/{match_id}"
+    return await call_riot_api(
+        session,
+        api_url,
+        riot_headers(riot_api_key),
+        schema=MATCH_SCHEMA,
+        hedge_after=hedge_after,
+    )
+
+
+async def get_matches(
+    session,
+    match_ids,
+    riot_api_key,
+    concurrency=MATCH_FETCH_CONCURRENCY,
+    hedge_after=None,
+):
+    """Fetches several matches concurrently, keeping the input order.
+
+    Pass ``hedge_after`` (e.g. ``MATCH_HEDGE_SECONDS``) to hedge requests
+    still running after that many seconds with a duplicate. Hedging spends
+    rate limit budget, so it is off by default and meant for commands someone
+    is waiting on. Matches that no longer exist are returned as None.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def fetch(match_id):
+        async with semaphore:
+            return await get_match(session, match_id, riot_api_key, hedge_after)
+
+    return await asyncio.gather(*(fetch(match_id) for match_id in match_ids))
+
+
+async def get_recent_match_info(session, puuid, riot_api_key):
+    match_id = await get_match_ids(session, puuid, riot_api_key)
+    match_info = await get_match(session, match_id[0], riot_api_key)
     return match_info
 
 
 async def get_puuid(session, game_name, tag_line, riot_api_key):
     api_url = f"https://americas.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
-    headers = {
-        "X-Riot-Token": riot_api_key,
-        "Accept": "application/json",
-        "User-Agent": "LeagueHelperApp/1.0",
-    }
-    data = await call_riot_api(session, api_url, headers)
+    data = await call_riot_api(session, api_url, riot_headers(riot_api_key))
     if data is None:
         raise UserNotFoundError(f"User {game_name}#{tag_line} not found.")
     return data.get("puuid")
@@ -82,12 +224,7 @@ async def get_puuid(session, game_name, tag_line, riot_api_key):
 async def get_ranked_info(session, puuid, riot_api_key):
     # currently this api call will only work for NA users
     api_url = f"https://na1.api.riotgames.com/lol/league/v4/entries/by-puuid/{puuid}"
-    headers = {
-        "X-Riot-Token": riot_api_key,
-        "Accept": "application/json",
-        "User-Agent": "LeagueHelperApp/1.0",
-    }
-    data = await call_riot_api(session, api_url, headers)
+    data = await call_riot_api(session, api_url, riot_headers(riot_api_key))
     if data is None:
         raise UserNotFoundError(f"User with puuid: {puuid} not found.")
     soloq = None
@@ -105,6 +242,42 @@ async def get_ranked_info(session, puuid, riot_api_key):
         return {"tier": "UNRANKED", "rank": "", "LP": 0}
 
 
+async def get_top_mastery(session, puuid, riot_api_key, count=3):
+    """Returns the championIds of a player's highest mastery champions."""
+    api_url = f"https://na1.api.riotgames.com/lol/champion-mastery/v4/champion-masteries/by-puuid/{puuid}/top?count={count}"
+    data = await call_riot_api(session, api_url, riot_headers(riot_api_key))
+    if data is None:
+        raise UserNotFoundError(f"User with puuid: {puuid} not found.")
+    return [entry.get("championId") for entry in data]
+
+
+async def get_active_game(session, puuid, riot_api_key):
+    """Returns the spectator-v5 game a player is currently in, or None."""
+    api_url = f"https://na1.api.riotgames.com/lol/spectator/v5/active-games/by-summoner/{puuid}"
+    return await call_riot_api(
+        session,
+        api_url,
+        riot_headers(riot_api_key),
+        schema=ACTIVE_GAME_SCHEMA,
+    )
+
+
+async def get_champion_names(session):
+    """Returns a championId -> champion name mapping from Data Dragon."""
+    headers = {"Accept": "application/json", "User-Agent": "LeagueHelperApp/1.0"}
+    versions = await call_riot_api(
+        session,
+        "https://ddragon.leagueoflegends.com/api/versions.json",
+        headers,
+    )
+    data = await call_riot_api(
+        session,
+        f"https://ddragon.leagueoflegends.com/cdn/{versions[0]}/data/en_US/champion.json",
+        headers,
+    )
+    return {int(c["key"]): c["name"] for c in data.get("data", {}).values()}
+
+
 # Helper Functions
 
 
@@ -0,0 +1,352 @@
+import asyncio
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+from logger_config import logger
+from utils import get_match_ids, get_matches
+
+# Configuration
+
+DEFAULT_WAREHOUSE_PATH = "match_warehouse"
+DICTIONARIES_FILE = "dictionaries.json"
+SEGMENT_PREFIX = "seg-"
+# Each flush writes a new segment, past this many they are merged into one so
+# reads don't have to stitch together lots of small files
+MAX_SEGMENTS = 16
+
+# String columns are dictionary encoded: the .npy file holds int32 codes and the
+# distinct values live in DICTIONARIES_FILE. Everything else is stored as-is.
+STRING_COLUMNS = ("match_id", "puuid", "champion", "role")
+NUMERIC_COLUMNS = {
+    "game_creation": np.int64,
+    "game_duration": np.int32,
+    "queue_id": np.int16,
+    "team_id": np.int16,
+    "kills": np.int16,
+    "deaths": np.int16,
+    "assists": np.int16,
+    "win": np.bool_,
+}
+
+
+def participant_rows(match_dto):
+    """Flattens a match-v5 DTO into one row per participant."""
+    if not match_dto or "info" not in match_dto:
+        return []
+    info = match_dto["info"]
+    match_id = match_dto.get("metadata", {}).get("matchId")
+    if not match_id:
+        return []
+    return [
+        {
+            "match_id": match_id,
+            "puuid": p.get("puuid") or "",
+            "champion": p.get("championName") or "",
+            "role": p.get("teamPosition") or "",
+            "game_creation": info.get("gameCreation") or 0,
+            "game_duration": info.get("gameDuration") or 0,
+            "queue_id": info.get("queueId") or 0,
+            "team_id": p.get("teamId") or 0,
+            "kills": p.get("kills") or 0,
+            "deaths": p.get("deaths") or 0,
+            "assists": p.get("assists") or 0,
+            "win": bool(p.get("win")),
+        }
+        for p in info.get("participants", [])
+    ]
+
+
+def column_dtype(column):
+    return np.int32 if column in STRING_COLUMNS else NUMERIC_COLUMNS[column]
+
+
+def segment_name(first, last):
+    return f"{SEGMENT_PREFIX}{first:06d}-{last:06d}"
+
+
+class MatchWarehouse:
+    """Local columnar store with one row per participant of every stored match.
+
+    Rows are buffered in memory by ``add_match`` and written out by ``flush``
+    as a new segment: a directory holding one file per column plus the
+    dictionary values first seen in it, so a flush only writes its own rows.
+    Segment ``seg-<first>-<last>`` covers flushes ``first`` to ``last``, and
+    once there are more than ``MAX_SEGMENTS`` they are compacted into one.
+    Reads go through read-only memory maps, so aggregate queries scan columns
+    without loading every match. Nothing touches the disk until the warehouse
+    is first used.
+    """
+
+    def __init__(self, path=DEFAULT_WAREHOUSE_PATH):
+        self.path = path
+        self._loaded = False
+        self._dictionaries = {}
+        self._codes = {}
+        self._match_ids = set()
+        self._pending = []
+        self._segments = []  # (first, last, {column: memmap}), oldest first
+        self._columns = None
+        self._flush_lock = threading.Lock()
+
+    # Loading
+
+    def _segment_ranges(self):
+        """Returns the (first, last) flush range of every live segment on disk.
+
+        A compaction that stopped before removing its inputs leaves segments
+        the merged one already covers, those are skipped.
+        """
+        if not os.path.isdir(self.path):
+            return []
+        ranges = []
+        for name in os.listdir(self.path):
+            if not name.startswith(SEGMENT_PREFIX) or name.endswith(".tmp"):
+                continue
+            first, last = name[len(SEGMENT_PREFIX) :].split("-")
+            ranges.append((int(first), int(last)))
+        live = []
+        for first, last in sorted(ranges, key=lambda r: (r[0], -r[1])):
+            if live and last <= live[-1][1]:
+                continue
+            live.append((first, last))
+        return live
+
+    def _load(self):
+        if self._loaded:
+            return
+        self._dictionaries = {column: [] for column in STRING_COLUMNS}
+        for first, last in self._segment_ranges():
+            segment_path = os.path.join(self.path, segment_name(first, last))
+            with open(
+                os.path.join(segment_path, DICTIONARIES_FILE),
+                encoding="utf-8",
+            ) as f:
+                added = json.load(f)
+            # Codes are handed out in flush order, so the segments' additions
+            # concatenate back into the full dictionaries
+            for column in STRING_COLUMNS:
+                self._dictionaries[column].extend(added.get(column, []))
+            self._segments.append((first, last, self._map_segment(segment_path)))
+        for column in STRING_COLUMNS:
+            values = self._dictionaries[column]
+            self._codes[column] = {value: code for code, value in enumerate(values)}
+        # Every stored match id got a dictionary code when it was first written
+        self._match_ids = set(self._dictionaries["match_id"])
+        self._loaded = True
+
+    @staticmethod
+    def _map_segment(segment_path):
+        return {
+            column: np.load(os.path.join(segment_path, f"{column}.npy"), mmap_mode="r")
+            for column in (*STRING_COLUMNS, *NUMERIC_COLUMNS)
+        }
+
+    def columns(self):
+        """Returns every stored column, concatenated across segments.
+
+        With a single segment the columns are its read-only memory maps.
+        """
+        self._load()
+        if self._columns is None:
+            if len(self._segments) == 1:
+                self._columns = dict(self._segments[0][2])
+            else:
+                self._columns = {
+                    column: np.concatenate(
+                        [columns[column] for _, _, columns in self._segments],
+                    )
+                    if self._segments
+                    else np.empty(0, dtype=column_dtype(column))
+                    for column in (*STRING_COLUMNS, *NUMERIC_COLUMNS)
+                }
+        return self._columns
+
+    # Writing
+
+    def has_match(self, match_id):
+        """Whether the match is stored or buffered for the next flush."""
+        self._load()
+        return match_id in self._match_ids
+
+    def add_match(self, match_dto):
+        """Buffers a match's participant rows, ignoring matches already stored."""
+        self._load()
+        rows = participant_rows(match_dto)
+        if not rows or rows[0]["match_id"] in self._match_ids:
+            return False
+        self._match_ids.add(rows[0]["match_id"])
+        self._pending.extend(rows)
+        return True
+
+    def _encode(self, column, values, added):
+        """Returns the codes of ``values``.
+
+        Values without a code yet get the next free ones, recorded in ``added``
+        (value -> code) rather than in the dictionaries, which only take them
+        once the segment using them is on disk.
+        """
+        codes = self._codes[column]
+        next_code = len(self._dictionaries[column])
+        encoded = np.empty(len(values), dtype=np.int32)
+        for i, value in enumerate(values):
+            code = codes.get(value)
+            if code is None:
+                code = added.get(value)
+            if code is None:
+                code = added[value] = next_code + len(added)
+            encoded[i] = code
+        return encoded
+
+    def flush(self):
+        """Writes the buffered rows to disk as a new segment.
+
+        Safe to call from a worker thread while the event loop keeps adding
+        matches, rows added mid-flush are kept for the next flush.
+        """
+        self._load()
+        with self._flush_lock:
+            rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            try:
+                self._write(rows)
+            except Exception:
+                # Nothing was kept, the rows (whose match ids stay known) go
+                # back in front of anything buffered meanwhile
+                self._pending[:0] = rows
+                raise
+            if len(self._segments) > MAX_SEGMENTS:
+                try:
+                    self._compact()
+                except OSError as e:
+                    # The segments are intact, compaction is retried next flush
+                    logger.exception(f"❌ ERROR: compacting the warehouse: {e}")
+        return len(rows)
+
+    def compact(self):
+        """Merges every segment into one."""
+        self._load()
+        with self._flush_lock:
+            self._compact()
+
+    def _write(self, rows):
+        added = {column: {} for column in STRING_COLUMNS}
+        new_columns = {
+            column: self._encode(column, [row[column] for row in rows], added[column])
+            for column in STRING_COLUMNS
+        }
+        for column, dtype in NUMERIC_COLUMNS.items():
+            new_columns[column] = np.array([row[column] for row in rows], dtype=dtype)
+        number = self._segments[-1][1] + 1 if self._segments else 0
+        segment = self._save_segment(
+            number,
+            number,
+            new_columns,
+            {column: list(values) for column, values in added.items()},
+        )
+        # The segment is on disk, its new codes are safe to hand out now
+        for column, values in added.items():
+            self._dictionaries[column].extend(values)
+            self._codes[column].update(values)
+        self._segments.append(segment)
+        self._columns = None
+
+    def _compact(self):
+        if len(self._segments) < 2:
+            return
+        merged = self.columns()
+        replaced = [(first, last) for first, last, _ in self._segments]
+        first, last = replaced[0][0], replaced[-1][1]
+        self._segments = [
+            self._save_segment(first, last, merged, self._dictionaries),
+        ]
+        self._columns = None
+        for old_first, old_last in replaced:
+            shutil.rmtree(
+                os.path.join(self.path, segment_name(old_first, old_last)),
+                ignore_errors=True,
+            )
+        logger.info(f"✅ Compacted {len(replaced)} warehouse segments")
+
+    def _save_segment(self, first, last, columns, dictionaries):
+        """Writes a segment next to the others, then moves it in place at once."""
+        segment_path = os.path.join(self.path, segment_name(first, last))
+        tmp_path = f"{segment_path}.tmp"
+        os.makedirs(tmp_path, exist_ok=True)
+        for column, values in columns.items():
+            np.save(os.path.join(tmp_path, f"{column}.npy"), values)
+        with open(
+            os.path.join(tmp_path, DICTIONARIES_FILE),
+            "w",
+            encoding="utf-8",
+        ) as f:
+            json.dump(dictionaries, f)
+        os.replace(tmp_path, segment_path)
+        return first, last, self._map_segment(segment_path)
+
+    # Queries
+
+    def player_columns(self, puuid, match_ids=None):
+        """Returns a player's rows, most recent first, with strings decoded.
+
+        Args:
+            puuid: The player to select.
+            match_ids: Optional collection restricting the selection to these
+                matches.
+
+        Returns:
+            A dict with one NumPy array per warehouse column, string columns
+            decoded back to object arrays.
+        """
+        self._load()
+        columns = self.columns()
+        puuid_code = self._codes["puuid"].get(puuid)
+        if puuid_code is None:
+            mask = np.zeros(len(columns["puuid"]), dtype=bool)
+        else:
+            mask = columns["puuid"] == puuid_code
+        if match_ids is not None:
+            match_codes = [
+                self._codes["match_id"][m]
+                for m in match_ids
+                if m in self._codes["match_id"]
+            ]
+            mask &= np.isin(columns["match_id"], match_codes)
+        selected = np.flatnonzero(mask)
+        selected = selected[np.argsort(-columns["game_creation"][selected])]
+        result = {}
+        for column in STRING_COLUMNS:
+            dictionary = np.array(self._dictionaries[column], dtype=object)
+            result[column] = dictionary[columns[column][selected]]
+        for column in NUMERIC_COLUMNS:
+            result[column] = np.asarray(columns[column][selected])
+        return result
+
+
+# Backfill
+
+
+async def backfill_matches(session, warehouse, puuids, riot_api_key, count):
+    """Pulls each player's last ``count`` ranked matches into the warehouse.
+
+    Matches already stored are skipped, the rest are fetched concurrently per
+    player through the rate limited Riot client.
+
+    Returns:
+        The number of matches added.
+    """
+    added = 0
+    for puuid in puuids:
+        match_ids = await get_match_ids(session, puuid, riot_api_key, count)
+        missing = [m for m in match_ids if not warehouse.has_match(m)]
+        if not missing:
+            continue
+        matches = await get_matches(session, missing, riot_api_key)
+        added += sum(warehouse.add_match(match) for match in matches)
+        await asyncio.to_thread(warehouse.flush)
+    logger.info(f"✅ Backfill stored {added} new matches for {len(puuids)} players")
+    return added